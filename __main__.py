@@ -0,0 +1,4 @@
+# Lets the app directory itself be run: python /app --batch /data/Meetings
+from app import main
+
+main()
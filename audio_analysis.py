@@ -0,0 +1,144 @@
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from audio_io import WHISPER_SAMPLE_RATE
+
+# Energy is measured over 30 ms frames
+FRAME_SECONDS = 0.03
+
+# Frames processed per block, so long memory-mapped channels never need a
+# full-length temporary array
+BLOCK_FRAMES = 20000
+
+
+def frame_energy_db(audio, sample_rate=WHISPER_SAMPLE_RATE):
+    """RMS level of each frame in dBFS"""
+    frame = int(sample_rate * FRAME_SECONDS)
+    frame_count = len(audio) // frame
+    levels = np.empty(frame_count, dtype=np.float32)
+    for first in range(0, frame_count, BLOCK_FRAMES):
+        last = min(first + BLOCK_FRAMES, frame_count)
+        block = np.asarray(audio[first * frame:last * frame], dtype=np.float32).reshape(-1, frame)
+        levels[first:last] = np.sqrt(np.mean(np.square(block), axis=1))
+    return 20 * np.log10(levels + 1e-10)
+
+
+def detect_speech_regions(audio, sample_rate=WHISPER_SAMPLE_RATE, margin_db=10.0,
+                          floor_db=-55.0, ceiling_db=-35.0, min_speech=0.25,
+                          min_silence=1.0, padding=0.3):
+    """
+    Find the spans of a channel that contain sound worth transcribing.
+
+    A frame is active when it is margin_db above the channel's noise floor
+    (its 10th percentile level), with the threshold kept between floor_db and
+    ceiling_db so that a channel which is never quiet still counts as
+    active wherever it is reasonably loud. Gaps shorter than
+    min_silence are bridged, bursts shorter than min_speech are dropped and
+    every region is padded so words at the edges keep some context.
+    Returns a list of (start_sample, end_sample) tuples.
+    """
+    levels = frame_energy_db(audio, sample_rate)
+    if len(levels) == 0:
+        return []
+
+    threshold = min(max(float(np.percentile(levels, 10)) + margin_db, floor_db), ceiling_db)
+    active = np.concatenate(([False], levels > threshold, [False]))
+    edges = np.flatnonzero(np.diff(active.astype(np.int8)))
+    runs = list(zip(edges[::2] * FRAME_SECONDS, edges[1::2] * FRAME_SECONDS))
+
+    regions = []
+    for start, end in runs:
+        if regions and start - regions[-1][1] < min_silence:
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+
+    duration = len(audio) / sample_rate
+    padded = []
+    for start, end in regions:
+        if end - start < min_speech:
+            continue
+        start = max(0.0, start - padding)
+        end = min(duration, end + padding)
+        if padded and start <= padded[-1][1]:
+            padded[-1] = (padded[-1][0], end)
+        else:
+            padded.append((start, end))
+
+    return [(int(start * sample_rate), int(end * sample_rate)) for start, end in padded]
+
+
+class SpeechTimeline:
+    """Maps timestamps in compacted (speech-only) audio back to the original"""
+
+    def __init__(self, regions, sample_rate=WHISPER_SAMPLE_RATE):
+        self.original_starts = []
+        self.compact_starts = []
+        self.compact_ends = []
+        position = 0
+        for start, end in regions:
+            self.original_starts.append(start / sample_rate)
+            self.compact_starts.append(position / sample_rate)
+            position += end - start
+            self.compact_ends.append(position / sample_rate)
+
+    def to_original(self, t, is_end=False):
+        if not self.compact_starts:
+            return t
+        # An end time sitting exactly on a join belongs to the earlier region
+        if is_end:
+            index = bisect_left(self.compact_ends, t)
+        else:
+            index = bisect_right(self.compact_starts, t) - 1
+        index = min(max(index, 0), len(self.compact_starts) - 1)
+        return self.original_starts[index] + (t - self.compact_starts[index])
+
+
+def compact_speech(audio, regions, sample_rate=WHISPER_SAMPLE_RATE):
+    """
+    Concatenate the speech regions of a channel into one array, so they can
+    be transcribed in a single batched call
+    Returns (speech_audio, timeline)
+    """
+    if not regions:
+        return np.zeros(0, dtype=np.float32), SpeechTimeline([], sample_rate)
+    speech = np.concatenate([audio[start:end] for start, end in regions]).astype(np.float32, copy=False)
+    return speech, SpeechTimeline(regions, sample_rate)
+
+
+# Decimated samples compared per channel; plenty for a stable correlation
+COMPARE_MAX_SAMPLES = 2_000_000
+
+
+def compare_channels(left, right, correlation_threshold=0.98):
+    """
+    Cheap check whether two channels carry the same audio (mono saved as
+    stereo), done on decimated PCM before any model work
+    Returns a dict with the decision, the channel correlation, the level of
+    their difference relative to the signal, and a 0-1 confidence
+    """
+    n = min(len(left), len(right))
+    step = max(16, n // COMPARE_MAX_SAMPLES)
+    l = np.asarray(left[:n:step], dtype=np.float64)
+    r = np.asarray(right[:n:step], dtype=np.float64)
+
+    energy = (np.mean(np.square(l)) + np.mean(np.square(r))) / 2 if len(l) else 0.0
+    if energy < 1e-8:
+        # Silence on both sides says nothing about the content
+        return {"mono": False, "correlation": 0.0, "difference_db": 0.0, "confidence": 0.0}
+
+    l_centered = l - l.mean()
+    r_centered = r - r.mean()
+    denominator = np.sqrt(np.sum(np.square(l_centered)) * np.sum(np.square(r_centered)))
+    correlation = float(np.sum(l_centered * r_centered) / denominator) if denominator > 0 else 0.0
+    difference_db = float(10 * np.log10(np.mean(np.square(l - r)) / energy + 1e-12))
+
+    mono = correlation >= correlation_threshold
+    confidence = correlation if mono else 1.0 - max(correlation, 0.0)
+    return {
+        "mono": bool(mono),
+        "correlation": round(correlation, 4),
+        "difference_db": round(difference_db, 1),
+        "confidence": round(confidence, 4),
+    }
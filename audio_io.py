@@ -0,0 +1,176 @@
+import subprocess
+import tempfile
+import threading
+
+import numpy as np
+
+# Whisper works on 16 kHz mono audio, so channels are decoded straight to that
+WHISPER_SAMPLE_RATE = 16000
+
+# Raw sample formats ffmpeg can write to stdout and how to read them back
+PCM_FORMATS = {
+    "s16le": (np.dtype("<i2"), 1.0 / 32768.0),
+    "f32le": (np.dtype("<f4"), 1.0),
+}
+
+# Frames read from ffmpeg per chunk (~4 seconds of audio)
+READ_FRAMES = WHISPER_SAMPLE_RATE * 4
+
+
+def channel_names(media):
+    """
+    Names of the speaker channels decoded from a recording: left/right for a
+    stereo file or a dual-track recording (Track 1 -> left, Track 2 ->
+    right), track1..trackN when there are more tracks
+    """
+    if media.audio_track_count <= 2:
+        return ["left", "right"]
+    return [f"track{i + 1}" for i in range(media.audio_track_count)]
+
+
+def build_channel_filter(media):
+    """
+    Build an ffmpeg filter graph that yields one 16 kHz stream [out] with a
+    channel per speaker, from a probed MediaInfo
+    Multi-track: each track (0:a:N) is mixed down to mono and becomes channel N
+    Single stereo track: channel 0 -> left, channel 1 -> right
+    Single mono track: the same audio on both sides
+    """
+    tracks = media.audio_track_count
+    if tracks >= 2:
+        mono = f"aresample={WHISPER_SAMPLE_RATE},aformat=channel_layouts=mono"
+        return (
+            "".join(f"[0:a:{i}]{mono}[track{i}];" for i in range(tracks))
+            + "".join(f"[track{i}]" for i in range(tracks))
+            + f"amerge=inputs={tracks}[out]"
+        )
+    if media.audio_streams[0].channels == 1:
+        return f"[0:a:0]pan=stereo|c0=c0|c1=c0,aresample={WHISPER_SAMPLE_RATE}[out]"
+    return f"[0:a:0]pan=stereo|c0=c0|c1=c1,aresample={WHISPER_SAMPLE_RATE}[out]"
+
+
+class ChannelBuffer:
+    """
+    Growable float32 sample storage for one channel.
+
+    Samples live in RAM until the buffer would exceed mmap_threshold samples,
+    after which they are moved to an anonymous scratch file and memory-mapped,
+    so multi-hour recordings do not have to fit in memory.
+    """
+
+    def __init__(self, capacity, mmap_threshold=None, scratch_dir=None):
+        self.length = 0
+        self.mmap_threshold = mmap_threshold
+        self.scratch_dir = scratch_dir
+        self._file = None
+        self._data = self._allocate(max(int(capacity), 1))
+
+    def _allocate(self, capacity):
+        if self._file is None and (self.mmap_threshold is None or capacity <= self.mmap_threshold):
+            return np.empty(capacity, dtype=np.float32)
+        if self._file is None:
+            # Already unlinked on POSIX, removed on close elsewhere
+            self._file = tempfile.TemporaryFile(dir=self.scratch_dir, suffix=".pcm")
+        self._file.truncate(capacity * 4)
+        return np.memmap(self._file, dtype=np.float32, mode="r+", shape=(capacity,))
+
+    def _grow(self, needed):
+        capacity = max(needed, len(self._data) * 2)
+        old = self._data
+        was_mapped = self._file is not None
+        self._data = self._allocate(capacity)
+        # A memory-mapped buffer grows in place; RAM buffers need a copy
+        if not was_mapped:
+            self._data[:self.length] = old[:self.length]
+
+    def append(self, samples, scale=1.0):
+        end = self.length + len(samples)
+        if end > len(self._data):
+            self._grow(end)
+        np.multiply(samples, scale, out=self._data[self.length:end], casting="unsafe")
+        self.length = end
+
+    @property
+    def is_memory_mapped(self):
+        return self._file is not None
+
+    def array(self):
+        """Float32 view of the samples written so far"""
+        return self._data[:self.length]
+
+
+def load_channels(source_path, media, expected_seconds=None,
+                  sample_format="s16le", scratch_dir=None, mmap_threshold_seconds=None,
+                  cancel_event=None, max_seconds=None):
+    """
+    Decode the source with a single ffmpeg process and read its raw PCM output
+    from stdout into per-channel float32 arrays, ready for model.transcribe
+    Buffers are sized from the probed duration unless expected_seconds is given
+    max_seconds stops decoding after that much audio
+    Setting cancel_event stops ffmpeg and raises InterruptedError
+    Returns one array per name in channel_names(media)
+    """
+    dtype, scale = PCM_FORMATS[sample_format]
+    channels = len(channel_names(media))
+
+    capacity = int((expected_seconds or max_seconds or media.duration or 600) * WHISPER_SAMPLE_RATE * 1.01)
+    mmap_threshold = (
+        int(mmap_threshold_seconds * WHISPER_SAMPLE_RATE) if mmap_threshold_seconds else None
+    )
+    buffers = [
+        ChannelBuffer(capacity, mmap_threshold, scratch_dir)
+        for _ in range(channels)
+    ]
+
+    process = subprocess.Popen([
+        "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-i", str(source_path),
+        "-filter_complex", build_channel_filter(media),
+        "-map", "[out]",
+        *(["-t", str(max_seconds)] if max_seconds else []),
+        "-f", sample_format,
+        "-ar", str(WHISPER_SAMPLE_RATE),
+        "pipe:1"
+    ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    # Drain stderr on the side so a chatty ffmpeg can never block the pipe
+    stderr_chunks = []
+    stderr_thread = threading.Thread(
+        target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True
+    )
+    stderr_thread.start()
+
+    frame_bytes = dtype.itemsize * channels
+    chunk = bytearray(READ_FRAMES * frame_bytes)
+    view = memoryview(chunk)
+    pending = 0
+    try:
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                process.kill()
+                raise InterruptedError("Decoding cancelled")
+            read = process.stdout.readinto(view[pending:])
+            if not read:
+                break
+            pending += read
+            usable = pending - pending % frame_bytes
+            if not usable:
+                continue
+            frames = np.frombuffer(chunk, dtype=dtype, count=usable // dtype.itemsize)
+            frames = frames.reshape(-1, channels)
+            for index, buffer in enumerate(buffers):
+                buffer.append(frames[:, index], scale)
+            # Keep any partial frame for the next read
+            leftover = pending - usable
+            view[:leftover] = view[usable:pending]
+            pending = leftover
+    finally:
+        process.stdout.close()
+        returncode = process.wait()
+        stderr_thread.join()
+
+    if returncode != 0:
+        stderr = b"".join(stderr_chunks).decode("utf-8", errors="replace")
+        raise RuntimeError(f"Error extracting audio channels: {stderr}")
+
+    return [buffer.array() for buffer in buffers]
@@ -0,0 +1,209 @@
+"""
+Measure which model settings transcribe fastest on this machine.
+
+Starting from the configured settings, each of compute_type, cpu_threads,
+beam_size and batch_size is varied in turn on a reference clip cut from a
+real recording, keeping a change only when it is faster and its words still
+agree with the baseline transcript. The winner is stored per model in
+~/.cache/mkv2transcript/tuned_profiles.json, which outlives the container
+in Docker, and the app merges it into "tuned_profiles" at startup.
+
+    python app.py --autotune recording.mkv --model small.en
+"""
+import json
+import os
+import platform
+import tempfile
+import time
+from difflib import SequenceMatcher
+from pathlib import Path
+
+from audio_analysis import compact_speech, detect_speech_regions
+from audio_io import WHISPER_SAMPLE_RATE, load_channels
+from media_probe import probe_media
+from model_registry import ModelRegistry, transcribe_audio
+from transcript_writers import words
+
+# The settings a profile decides, with the values used when nothing is configured
+PROFILE_DEFAULTS = {
+    "compute_type": "int8",
+    "cpu_threads": 0,
+    "beam_size": 5,
+    "batch_size": 0,
+}
+
+# Only ever tried in this order, narrowest weights first
+COMPUTE_TYPES = ("int8", "int8_float32", "int16", "float32")
+BEAM_SIZES = (5, 3, 1)
+BATCH_SIZES = (0, 8, 16)
+
+# Share of baseline words a candidate may lose and still be accepted
+DEFAULT_TOLERANCE = 0.05
+
+# A candidate must beat the current best by this much, so timing noise
+# does not decide between two equally fast settings
+MIN_SPEEDUP = 1.03
+
+
+def default_profiles_path():
+    return Path.home() / ".cache" / "mkv2transcript" / "tuned_profiles.json"
+
+
+def load_tuned_profiles(path=None):
+    """Tuning results saved by save_tuned_profile, by model; {} if there are none"""
+    path = Path(path) if path else default_profiles_path()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            profiles = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Warning: Could not load tuned profiles from {path}: {e}")
+        return {}
+    return profiles if isinstance(profiles, dict) else {}
+
+
+def tuned_profile(config, model_size):
+    """
+    Settings for a model: the configured values, overridden by the profile
+    tuned for it on a machine with the same number of cores
+    """
+    profile = {key: type(default)(config.get(key, default)) for key, default in PROFILE_DEFAULTS.items()}
+    tuned = (config.get("tuned_profiles") or {}).get(model_size)
+    if tuned and tuned.get("cpu_count") == os.cpu_count():
+        profile.update({key: tuned[key] for key in PROFILE_DEFAULTS if key in tuned})
+    return profile
+
+
+def supported_compute_types():
+    try:
+        import ctranslate2
+    except ImportError:
+        return ["int8", "float32"]
+    supported = ctranslate2.get_supported_compute_types("cpu")
+    return [compute_type for compute_type in COMPUTE_TYPES if compute_type in supported]
+
+
+def candidate_values(cores=None):
+    """The values tried for each setting, in the order they are tuned"""
+    cores = cores or os.cpu_count() or 1
+    return (
+        ("compute_type", supported_compute_types()),
+        ("cpu_threads", sorted({0, cores, max(1, cores // 2)})),
+        ("beam_size", list(BEAM_SIZES)),
+        ("batch_size", list(BATCH_SIZES)),
+    )
+
+
+def word_agreement(reference, hypothesis):
+    """Share of matching words between two word lists, 1.0 when identical"""
+    if not reference and not hypothesis:
+        return 1.0
+    return SequenceMatcher(None, reference, hypothesis, autojunk=False).ratio()
+
+
+def reference_clip(path, seconds=120):
+    """
+    Up to seconds of speech from the track with the most of it, cut from the
+    first few minutes of a recording
+    """
+    media = probe_media(path)
+    best = None
+    # Silence is cut out, so decode more than asked for to fill the clip
+    for audio in load_channels(path, media, max_seconds=seconds * 3):
+        speech, _ = compact_speech(audio, detect_speech_regions(audio))
+        if best is None or len(speech) > len(best):
+            best = speech
+    if best is None or not len(best):
+        raise ValueError(f"No speech found in {Path(path).name}")
+    return best[:int(seconds * WHISPER_SAMPLE_RATE)]
+
+
+def measure(registry, model_size, profile, audio, vad_filter=True, repeat=1):
+    """Best wall time of transcribing audio with a profile, and the transcript"""
+    model = registry.get(model_size, profile["compute_type"], profile["cpu_threads"], 1)
+    options = {"language": "en", "beam_size": profile["beam_size"], "vad_filter": vad_filter}
+    # A short warm-up keeps one-time allocations out of the timing
+    segments, _ = transcribe_audio(model, audio[:5 * WHISPER_SAMPLE_RATE], profile["batch_size"], **options)
+    list(segments)
+
+    best = None
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        segments, _ = transcribe_audio(model, audio, profile["batch_size"], **options)
+        text = " ".join(segment.text.strip() for segment in segments)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, text
+
+
+def autotune(model_size, audio, baseline, tolerance=DEFAULT_TOLERANCE, vad_filter=True,
+             repeat=1, registry=None, log=print):
+    """
+    Coordinate search from the baseline profile; returns the chosen profile
+    with how it compares to the baseline, and every trial
+    """
+    # Holding one model at a time keeps the search within the RAM of one copy
+    registry = registry or ModelRegistry(ram_budget_mb=1)
+    audio_seconds = len(audio) / WHISPER_SAMPLE_RATE
+
+    base_seconds, base_text = measure(registry, model_size, baseline, audio, vad_filter, repeat)
+    base_words = words(base_text)
+    log(f"⏱️ Baseline {baseline}: {base_seconds:.2f}s for {audio_seconds:.0f}s of audio")
+    trials = [{**baseline, "seconds": round(base_seconds, 3), "agreement": 1.0, "accepted": True}]
+
+    best, best_seconds, best_agreement = dict(baseline), base_seconds, 1.0
+    for key, values in candidate_values():
+        for value in values:
+            if value == best[key]:
+                continue
+            candidate = {**best, key: value}
+            try:
+                seconds, text = measure(registry, model_size, candidate, audio, vad_filter, repeat)
+            except Exception as e:
+                log(f"⚠️ {key}={value} failed: {e}")
+                continue
+            agreement = word_agreement(base_words, words(text))
+            accepted = agreement >= 1 - tolerance and seconds * MIN_SPEEDUP < best_seconds
+            trials.append({**candidate, "seconds": round(seconds, 3), "agreement": round(agreement, 4), "accepted": accepted})
+            log(f"{'✅' if accepted else '➖'} {key}={value}: {seconds:.2f}s, {agreement:.1%} word agreement")
+            if accepted:
+                best, best_seconds, best_agreement = candidate, seconds, agreement
+
+    return {
+        "profile": best,
+        "baseline": dict(baseline),
+        "seconds": round(best_seconds, 3),
+        "baseline_seconds": round(base_seconds, 3),
+        "speedup": round(base_seconds / best_seconds, 2),
+        "agreement": round(best_agreement, 4),
+        "audio_seconds": round(audio_seconds, 1),
+        "trials": trials,
+    }
+
+
+def save_tuned_profile(model_size, result, path=None):
+    """Store a tuning result with those of the other models, returning it"""
+    path = Path(path) if path else default_profiles_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    profiles = load_tuned_profiles(path)
+    profiles[model_size] = {
+        **result["profile"],
+        "speedup": result["speedup"],
+        "agreement": result["agreement"],
+        "cpu_count": os.cpu_count(),
+        "processor": platform.processor() or platform.machine(),
+        "tuned_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+    # Written alongside and renamed, so a crash never leaves half a file
+    fd, partial = tempfile.mkstemp(dir=path.parent, prefix=".tuned_profiles.", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(profiles, f, indent=2)
+            f.write("\n")
+        os.replace(partial, path)
+    except BaseException:
+        os.unlink(partial)
+        raise
+    return profiles[model_size]
@@ -0,0 +1,114 @@
+import glob
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+# Inputs picked up when scanning a directory
+MEDIA_EXTENSIONS = {".mkv", ".mp4", ".avi", ".mov", ".wav", ".mp3"}
+
+
+def discover_sources(targets, recursive=False):
+    """
+    Expand directories and glob patterns into a sorted list of media files
+    """
+    sources = set()
+    for target in targets:
+        path = Path(target)
+        if path.is_dir():
+            candidates = path.rglob("*") if recursive else path.iterdir()
+        elif path.is_file():
+            candidates = [path]
+        else:
+            candidates = (Path(match) for match in glob.glob(target, recursive=True))
+        for candidate in candidates:
+            if candidate.is_file() and candidate.suffix.lower() in MEDIA_EXTENSIONS:
+                sources.add(candidate.resolve())
+    return sorted(sources)
+
+
+def transcript_path(source, output_format):
+    """Transcripts are written next to their source: <stem>_transcript.<format>"""
+    return source.with_name(f"{source.stem}_transcript.{output_format}")
+
+
+def is_up_to_date(source, output):
+    """True when the transcript exists and is newer than its source"""
+    try:
+        return output.stat().st_mtime >= source.stat().st_mtime
+    except OSError:
+        return False
+
+
+def run_batch(sources, transcribe, output_format="md", workers=2, force=False, log=print):
+    """
+    Transcribe many recordings through a bounded worker pool
+
+    transcribe(source, output_file) runs one job and returns its result dict
+    (with "audio_seconds" and "cached"); jobs run on threads so they share
+    the models already loaded in this process. Sources whose transcript is
+    newer than the recording are skipped unless force is set.
+    Returns a summary report dict.
+    """
+    pending = []
+    skipped = []
+    for source in sources:
+        output = transcript_path(source, output_format)
+        if not force and is_up_to_date(source, output):
+            skipped.append(str(source))
+        else:
+            pending.append((source, output))
+
+    log(f"📂 {len(sources)} recordings found: {len(pending)} to transcribe, {len(skipped)} already up to date")
+
+    completed = []
+    failed = []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {
+            pool.submit(transcribe, source, output): (source, output)
+            for source, output in pending
+        }
+        for future in as_completed(futures):
+            source, output = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failed.append({"source": str(source), "error": str(e)})
+                log(f"❌ {source.name}: {e}")
+                continue
+            completed.append({
+                "source": str(source),
+                "output": str(output),
+                "audio_seconds": result.get("audio_seconds", 0.0),
+                "cached": result.get("cached", False),
+                "performance": result.get("performance"),
+            })
+            log(f"✅ {source.name} → {output.name} ({len(completed) + len(failed)}/{len(pending)})")
+    wall_seconds = time.perf_counter() - started
+
+    audio_hours = sum(item["audio_seconds"] for item in completed) / 3600
+    wall_hours = wall_seconds / 3600
+    report = {
+        "found": len(sources),
+        "transcribed": len(completed),
+        "skipped": len(skipped),
+        "failed": len(failed),
+        "audio_hours": round(audio_hours, 3),
+        "wall_hours": round(wall_hours, 4),
+        "audio_hours_per_wall_hour": round(audio_hours / wall_hours, 2) if wall_hours > 0 else 0.0,
+        "workers": workers,
+        "completed": completed,
+        "skipped_sources": skipped,
+        "failures": failed,
+    }
+    log(
+        f"📊 Batch done: {report['transcribed']} transcribed, {report['skipped']} skipped, "
+        f"{report['failed']} failed | {audio_hours:.2f} audio hours in {wall_seconds / 60:.1f} min "
+        f"({report['audio_hours_per_wall_hour']:.1f} audio-hours per wall-hour)"
+    )
+    return report
+
+
+def write_report(report, path):
+    Path(path).write_text(json.dumps(report, indent=2), encoding="utf-8")
@@ -0,0 +1,291 @@
+"""
+Offline benchmark of the transcription pipeline.
+
+Generates synthetic recordings with ffmpeg's lavfi sources and runs them
+through pipeline.transcribe_file, reporting the stages it times itself. The
+default stub transcriber is deterministic and needs no model, so runs are
+comparable between machines and commits; --transcriber faster-whisper uses
+a real local model instead.
+
+    python benchmark.py --minutes 1 10 --repeat 3 --output results.json
+"""
+import argparse
+import heapq
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import pipeline
+from audio_io import WHISPER_SAMPLE_RATE
+from instrumentation import StageTimer
+from media_probe import MediaProbe
+from model_registry import ModelRegistry
+from transcript_writers import TRANSCRIPT_WRITERS, open_transcript_writer
+
+# Fixture kinds: the OBS layout with one track per speaker, and a plain
+# stereo file with one speaker per channel
+FIXTURE_KINDS = ("dual_mkv", "stereo_wav")
+
+# Speakers take turns every 20 seconds, with a short overlap, and pause
+# for a few seconds every minute so the energy gate has silence to skip
+SPEAKER_GATES = (
+    "if(lt(mod(t,60),55)*lt(mod(t,40),21),1,0.003)",
+    "if(lt(mod(t,60),55)*gte(mod(t,40),19),1,0.003)",
+)
+
+
+def fixture_path(directory, kind, seconds):
+    extension = "mkv" if kind == "dual_mkv" else "wav"
+    return Path(directory) / f"bench_{kind}_{int(seconds)}s.{extension}"
+
+
+def make_fixture(directory, kind, seconds):
+    """
+    Create a synthetic recording with two speakers (pink noise switched on
+    and off in turns) unless it already exists; returns its path
+    """
+    path = fixture_path(directory, kind, seconds)
+    if path.exists():
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    sources = []
+    for seed, gate in enumerate(SPEAKER_GATES, start=1):
+        sources += [
+            "-f", "lavfi",
+            "-i", f"anoisesrc=color=pink:amplitude=0.3:seed={seed}:sample_rate=48000:duration={seconds}",
+        ]
+    speakers = ";".join(
+        f"[{i}:a]volume='{gate}':eval=frame[s{i}]" for i, gate in enumerate(SPEAKER_GATES)
+    )
+    if kind == "dual_mkv":
+        graph = speakers
+        outputs = ["-map", "[s0]", "-map", "[s1]", "-c:a", "aac", "-b:a", "96k"]
+    else:
+        graph = f"{speakers};[s0][s1]join=inputs=2:channel_layout=stereo[out]"
+        outputs = ["-map", "[out]", "-c:a", "pcm_s16le"]
+
+    # Write under a temporary name so an interrupted run leaves no fixture behind
+    partial = path.with_name(f"partial_{path.name}")
+    result = subprocess.run(
+        ["ffmpeg", "-nostdin", "-y", "-v", "error"] + sources
+        + ["-filter_complex", graph] + outputs + [str(partial)],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        partial.unlink(missing_ok=True)
+        raise RuntimeError(f"Could not create fixture {path.name}: {result.stderr}")
+    os.replace(partial, path)
+    return path
+
+
+StubSegment = namedtuple("StubSegment", "start end text")
+StubInfo = namedtuple("StubInfo", "duration duration_after_vad language")
+
+
+class StubTranscriber:
+    """
+    Stand-in for WhisperModel with the same transcribe() interface. It emits
+    one segment every segment_seconds of audio whose text depends only on
+    the audio, and can optionally spend seconds_per_audio_second of CPU per
+    second of input to mimic a model of a given speed.
+    """
+
+    def __init__(self, segment_seconds=4.0, seconds_per_audio_second=0.0):
+        self.segment_seconds = segment_seconds
+        self.seconds_per_audio_second = seconds_per_audio_second
+
+    def transcribe(self, audio, **options):
+        duration = len(audio) / WHISPER_SAMPLE_RATE
+        step = int(self.segment_seconds * WHISPER_SAMPLE_RATE)
+
+        def segments():
+            for start in range(0, len(audio) - step // 2, step):
+                window = audio[start:start + step]
+                if self.seconds_per_audio_second:
+                    _spin(self.seconds_per_audio_second * len(window) / WHISPER_SAMPLE_RATE)
+                level = float(abs(window).mean()) if len(window) else 0.0
+                yield StubSegment(
+                    start / WHISPER_SAMPLE_RATE,
+                    min(start + step, len(audio)) / WHISPER_SAMPLE_RATE,
+                    f"segment {start // step} level {level:.4f}"
+                )
+
+        return segments(), StubInfo(duration, duration, options.get("language", "en"))
+
+
+def _spin(seconds):
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        pass
+
+
+def configure_pipeline(transcriber_name, compute_type="int8"):
+    """
+    Prepare the pipeline module for benchmarking: the stub is served by
+    pipeline.model_registry in place of faster-whisper (and chunk workers,
+    which would load real models, are turned off), and the transcript
+    cache, checkpoints and search index are bypassed so every run does the
+    full work with the configured settings, untuned
+    """
+    if transcriber_name == "stub":
+        transcriber = StubTranscriber()
+        pipeline.model_registry = ModelRegistry(ram_budget_mb=0, load=lambda *settings: transcriber)
+        pipeline.chunk_pool = None
+    elif transcriber_name != "faster-whisper":
+        raise ValueError(f"Unknown transcriber: {transcriber_name}")
+    pipeline.config["compute_type"] = compute_type
+    pipeline.config["tuned_profiles"] = {}
+    pipeline.transcript_cache = None
+    pipeline.checkpoint_store = None
+    pipeline.transcript_index = None
+
+
+def run_pipeline(source, output_dir, model_size="tiny.en", output_format="md"):
+    """
+    Transcribe one file once with pipeline.transcribe_file, then merge its
+    speakers' segments again and render them in every output format, each
+    timed as a stage of its own
+    Returns the stage records, the number of segments and the audio length
+    """
+    # A fresh probe cache, so every run probes the file again
+    pipeline.media_probe = MediaProbe()
+    output_file = Path(output_dir) / f"{Path(source).stem}_transcript.{output_format}"
+    result = None
+    streams = {}
+    for event in pipeline.transcribe_file(source, [], output_file, model_size, output_format,
+                                          scratch_dir=output_dir):
+        for entry in event.get("segments", ()):
+            streams.setdefault(entry["speaker"], []).append(entry)
+        result = event.get("result", result)
+
+    # Each speaker's segments are already in order, as a channel's are
+    timer = StageTimer()
+    timer.start("merge")
+    entries = list(heapq.merge(*streams.values(), key=lambda e: e["start"]))
+    for name in TRANSCRIPT_WRITERS:
+        timer.start(f"render_{name}")
+        writer = open_transcript_writer(
+            name, Path(output_dir) / f"{Path(source).stem}_render.{name}", {"source_file": Path(source).name}
+        )
+        for entry in entries:
+            writer.write(entry)
+        writer.close()
+    timer.stop()
+
+    stages = {**result["performance"]["stages"], **timer.summary()["stages"]}
+    return stages, result["segments"], result["audio_seconds"]
+
+
+def summarize(runs):
+    """Best and median of each stage over repeated runs"""
+    stages = {}
+    for run in runs:
+        for name, record in run.items():
+            stages.setdefault(name, []).append(record)
+    summary = {}
+    for name, records in stages.items():
+        wall = [record["wall_seconds"] for record in records]
+        cpu = [record["cpu_seconds"] for record in records]
+        summary[name] = {
+            "wall_seconds_min": round(min(wall), 4),
+            "wall_seconds_median": round(statistics.median(wall), 4),
+            "cpu_seconds_median": round(statistics.median(cpu), 4),
+            "peak_rss_mb": round(max(record["peak_rss_mb"] for record in records), 1),
+        }
+    return summary
+
+
+def host_info():
+    try:
+        ffmpeg = subprocess.run(["ffmpeg", "-version"], capture_output=True, text=True).stdout.split("\n")[0]
+    except OSError:
+        ffmpeg = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "ffmpeg": ffmpeg,
+    }
+
+
+def run_benchmark(minutes, kinds=FIXTURE_KINDS, transcriber_name="stub", model_size="tiny.en",
+                  compute_type="int8", repeat=3, fixtures_dir=None, output_format="md", log=print):
+    """Benchmark every fixture kind at every length; returns the results dict"""
+    fixtures_dir = Path(fixtures_dir or Path(tempfile.gettempdir()) / "transcribe" / "bench_fixtures")
+    configure_pipeline(transcriber_name, compute_type)
+
+    results = []
+    for length in minutes:
+        seconds = int(length * 60)
+        for kind in kinds:
+            log(f"🛠️ Preparing {kind} fixture ({seconds}s)...")
+            source = make_fixture(fixtures_dir, kind, seconds)
+            runs = []
+            with tempfile.TemporaryDirectory() as output_dir:
+                for i in range(repeat):
+                    run_stages, segments, duration = run_pipeline(source, output_dir, model_size, output_format)
+                    runs.append(run_stages)
+            stages = summarize(runs)
+            total = sum(stage["wall_seconds_median"] for stage in stages.values())
+            transcribe = sum(
+                stage["wall_seconds_median"] for name, stage in stages.items() if name.startswith("transcribe")
+            )
+            results.append({
+                "fixture": source.name,
+                "kind": kind,
+                "audio_seconds": round(duration, 2),
+                "segments": segments,
+                "wall_seconds_median": round(total, 4),
+                "real_time_factor": round(total / duration, 5) if duration else None,
+                "transcribe_real_time_factor": round(transcribe / duration, 5) if duration else None,
+                "stages": stages,
+            })
+            log(f"📊 {source.name}: {total:.2f}s for {duration:.0f}s of audio ({segments} segments)")
+
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": host_info(),
+        "transcriber": transcriber_name if transcriber_name == "stub" else f"{transcriber_name}/{model_size}/{compute_type}",
+        "repeat": repeat,
+        "format": output_format,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the transcription pipeline on synthetic recordings")
+    parser.add_argument("--minutes", type=float, nargs="+", default=[1, 10],
+                        help="Fixture lengths in minutes")
+    parser.add_argument("--kinds", nargs="+", choices=FIXTURE_KINDS, default=list(FIXTURE_KINDS))
+    parser.add_argument("--transcriber", choices=["stub", "faster-whisper"], default="stub")
+    parser.add_argument("--model", default="tiny.en", help="Model for --transcriber faster-whisper")
+    parser.add_argument("--compute-type", default="int8")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--format", choices=list(TRANSCRIPT_WRITERS), default="md", help="Transcript format written")
+    parser.add_argument("--fixtures-dir", help="Where generated fixtures are kept between runs")
+    parser.add_argument("--output", metavar="FILE", help="Write the results as JSON (default: stdout)")
+    args = parser.parse_args()
+
+    log = (lambda message: print(message, file=sys.stderr)) if not args.output else print
+    results = run_benchmark(
+        args.minutes, args.kinds, args.transcriber, args.model, args.compute_type,
+        max(1, args.repeat), args.fixtures_dir, args.format, log=log
+    )
+    report = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(report, encoding="utf-8")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
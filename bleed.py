@@ -0,0 +1,254 @@
+"""
+Find and remove cross-channel bleed: a participant without headphones has
+the meeting audio playing into their mic, so the same words turn up on two
+channels, the echo always quieter than the original.
+
+Two places catch it. Before transcription, bleed_regions compares the level
+envelopes of the channels and returns the stretches of one that only carry
+a quieter copy of another, so they can be cut out with the silence and the
+model never transcribes the same speech twice. After transcription,
+suppress_bleed sweeps over the merged segments, pairs those that overlap in
+time on different channels, and drops a segment whose words are covered by
+louder overlapping ones and whose level follows theirs, so a short genuine
+reply that happens to repeat a word is kept.
+"""
+import heapq
+from collections import deque
+from difflib import SequenceMatcher
+
+import numpy as np
+
+from audio_analysis import FRAME_SECONDS, frame_energy_db
+from audio_io import WHISPER_SAMPLE_RATE
+from transcript_writers import words
+
+# The echo must be at least this much quieter than the original
+BLEED_MARGIN_DB = 6.0
+
+# Share of a segment's words that must appear in louder overlapping
+# segments for it to count as their echo
+MIN_COVERAGE = 0.6
+
+# Segments with fewer words are never taken for an echo: "Yeah." matches too
+# much of what anyone else says
+MIN_ECHO_WORDS = 3
+
+# Segment timestamps of the same speech differ between channels by up to
+# this much, so intervals this close still count as overlapping
+OVERLAP_SLACK_SECONDS = 1.0
+
+# Envelope comparison for masking: window length, the echo delays tried,
+# the envelope correlation that marks a window as bleed and the shortest
+# stretch worth cutting out
+WINDOW_SECONDS = 1.0
+MAX_LAG_SECONDS = 0.5
+MIN_CORRELATION = 0.8
+MIN_MASK_SECONDS = 0.5
+
+# How far above its noise floor the original must be, as in the energy gate
+ACTIVE_MARGIN_DB = 10.0
+
+
+def level_db(audio, start, end, sample_rate=WHISPER_SAMPLE_RATE):
+    """RMS level in dBFS of audio between start and end seconds"""
+    span = np.asarray(audio[int(start * sample_rate):int(end * sample_rate)], dtype=np.float32)
+    if not len(span):
+        return -200.0
+    return float(20 * np.log10(np.sqrt(np.mean(np.square(span))) + 1e-10))
+
+
+def rolling_sum(values, window):
+    """Sums of every run of window consecutive values"""
+    totals = np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+    return totals[window:] - totals[:-window]
+
+
+def rolling_correlation(x, y, window):
+    """Pearson correlation of x and y over every window of window values"""
+    sx, sy = rolling_sum(x, window), rolling_sum(y, window)
+    sxx, syy = rolling_sum(x * x, window), rolling_sum(y * y, window)
+    sxy = rolling_sum(x * y, window)
+    covariance = window * sxy - sx * sy
+    spread = np.sqrt(np.maximum(window * sxx - sx * sx, 0) * np.maximum(window * syy - sy * sy, 0))
+    return np.divide(covariance, spread, out=np.zeros_like(covariance), where=spread > 0)
+
+
+def lagged_correlation(own_envelope, ref_envelope, window, max_lag):
+    """
+    For every window of own_envelope, the best correlation with the same
+    window of ref_envelope delayed by up to max_lag frames (own frame i
+    echoes reference frame i - lag); one value per window of ref_envelope
+    """
+    count = len(ref_envelope) - window + 1
+    best = np.zeros(count)
+    for lag in range(min(max_lag, count - 1) + 1):
+        correlation = rolling_correlation(own_envelope[lag:len(ref_envelope)], ref_envelope[:len(ref_envelope) - lag], window)
+        best[lag:lag + len(correlation)] = np.maximum(best[lag:lag + len(correlation)], correlation)
+    return best
+
+
+def bleed_regions(audio, references, margin_db=BLEED_MARGIN_DB, sample_rate=WHISPER_SAMPLE_RATE):
+    """
+    Stretches of audio that only carry a delayed, quieter copy of one of the
+    reference channels: every WINDOW_SECONDS window whose level envelope
+    follows a reference's (at any delay up to MAX_LAG_SECONDS) while staying
+    margin_db below it. Returns sorted (start_sample, end_sample) tuples
+    """
+    own = frame_energy_db(audio, sample_rate)
+    window = int(round(WINDOW_SECONDS / FRAME_SECONDS))
+    max_lag = int(round(MAX_LAG_SECONDS / FRAME_SECONDS))
+    frames = len(own)
+    if frames < window:
+        return []
+    bleed = np.zeros(frames - window + 1, dtype=bool)
+
+    own_envelope = 10 ** (own.astype(np.float64) / 20)
+    own_mean = rolling_sum(own, window) / window
+    for reference in references:
+        ref = frame_energy_db(reference, sample_rate)[:frames]
+        if len(ref) < window:
+            continue
+        ref_mean = rolling_sum(ref, window) / window
+        count = len(ref_mean)
+        quieter = own_mean[:count] <= ref_mean - margin_db
+        active = ref_mean >= float(np.percentile(ref, 10)) + ACTIVE_MARGIN_DB
+
+        ref_envelope = 10 ** (ref.astype(np.float64) / 20)
+        best = lagged_correlation(own_envelope, ref_envelope, window, max_lag)
+        bleed[:count] |= quieter & active & (best >= MIN_CORRELATION)
+
+    # A frame is bleed when any window covering it is
+    edges = np.zeros(frames + 1, dtype=np.int32)
+    starts = np.flatnonzero(bleed)
+    np.add.at(edges, starts, 1)
+    np.add.at(edges, starts + window, -1)
+    covered = np.concatenate(([False], np.cumsum(edges[:-1]) > 0, [False]))
+    runs = np.flatnonzero(np.diff(covered.astype(np.int8)))
+    frame = int(sample_rate * FRAME_SECONDS)
+    min_frames = MIN_MASK_SECONDS / FRAME_SECONDS
+    return [
+        (int(start) * frame, int(end) * frame)
+        for start, end in zip(runs[::2], runs[1::2]) if end - start >= min_frames
+    ]
+
+
+def follows_envelope(audio, reference, start, end, sample_rate=WHISPER_SAMPLE_RATE):
+    """
+    Whether the level envelope of audio between start and end seconds
+    follows that of reference at some delay up to MAX_LAG_SECONDS, as an
+    echo of it does
+    """
+    max_lag = int(round(MAX_LAG_SECONDS / FRAME_SECONDS))
+    frame = int(sample_rate * FRAME_SECONDS)
+    first, last = int(start / FRAME_SECONDS), int(end / FRAME_SECONDS)
+    window = last - first
+    if window < 2:
+        return False
+    # Both envelopes start max_lag frames early, so every delay is covered
+    offset = min(first, max_lag)
+    own = frame_energy_db(audio[(first - offset) * frame:last * frame], sample_rate)
+    ref = frame_energy_db(reference[(first - offset) * frame:last * frame], sample_rate)
+    if len(own) < offset + window or len(ref) < offset + window:
+        return False
+    best = lagged_correlation(10 ** (own.astype(np.float64) / 20), 10 ** (ref.astype(np.float64) / 20), window, max_lag)
+    return bool(best[offset] >= MIN_CORRELATION)
+
+
+def subtract_regions(regions, masked, min_samples=0):
+    """
+    Remove the masked spans from sorted (start, end) regions, dropping
+    leftovers shorter than min_samples
+    """
+    result = []
+    index = 0
+    for start, end in regions:
+        while index < len(masked) and masked[index][1] <= start:
+            index += 1
+        cursor = start
+        for mask_start, mask_end in masked[index:]:
+            if mask_start >= end:
+                break
+            if mask_start > cursor:
+                result.append((cursor, mask_start))
+            cursor = max(cursor, mask_end)
+        if cursor < end:
+            result.append((cursor, end))
+    return [(start, end) for start, end in result if end - start >= max(min_samples, 1)]
+
+
+class _Held:
+    """A segment waiting until every segment that could overlap it has arrived"""
+
+    __slots__ = ("entry", "words", "level", "overlapping")
+
+    def __init__(self, entry, level):
+        self.entry = entry
+        self.words = words(entry["text"])
+        self.level = level
+        self.overlapping = []
+
+
+def is_echo(held, margin_db=BLEED_MARGIN_DB, min_coverage=MIN_COVERAGE, follows=None):
+    """
+    Whether a segment repeats louder segments of other channels that overlap
+    it: it has at least MIN_ECHO_WORDS words, enough of them appear, in
+    order, in their combined text and, given follows(entry, other_entry),
+    its level envelope follows one of theirs over its span
+    """
+    louder = sorted(
+        (other for other in held.overlapping if other.level >= held.level + margin_db),
+        key=lambda other: other.entry["start"]
+    )
+    if not louder or len(held.words) < MIN_ECHO_WORDS:
+        return False
+    reference = [word for other in louder for word in other.words]
+    matcher = SequenceMatcher(None, held.words, reference, autojunk=False)
+    matched = sum(block.size for block in matcher.get_matching_blocks())
+    if matched / len(held.words) < min_coverage:
+        return False
+    return follows is None or any(follows(held.entry, other.entry) for other in louder)
+
+
+def suppress_bleed(entries, level, stats=None, margin_db=BLEED_MARGIN_DB, min_coverage=MIN_COVERAGE,
+                   slack=OVERLAP_SLACK_SECONDS, follows=None):
+    """
+    Drop echoed segments from a stream of entries sorted by start, as
+    produced by merging the channels; level(entry) is the level in dB of the
+    entry's own channel over its span, and follows(entry, other_entry)
+    whether that channel's envelope follows other_entry's channel there
+
+    A sweep line keeps the segments that can still overlap a later one on a
+    heap ordered by end, so each new segment is paired with exactly the
+    earlier ones it overlaps, in O(n log n) overall. A segment is released,
+    still in start order, once a later one starts after its end. The number
+    of segments dropped per channel is counted in stats
+    """
+    held = deque()
+    active = []
+    order = 0
+    for entry in entries:
+        start = entry["start"]
+        while active and active[0][0] < start:
+            heapq.heappop(active)
+        current = _Held(entry, level(entry))
+        for _, _, other in active:
+            if other.entry["channel"] != entry["channel"]:
+                other.overlapping.append(current)
+                current.overlapping.append(other)
+        heapq.heappush(active, (entry["end"] + slack, order, current))
+        order += 1
+        held.append(current)
+
+        while held[0].entry["end"] + slack < start:
+            yield from _release(held.popleft(), stats, margin_db, min_coverage, follows)
+    while held:
+        yield from _release(held.popleft(), stats, margin_db, min_coverage, follows)
+
+
+def _release(held, stats, margin_db, min_coverage, follows):
+    if is_echo(held, margin_db, min_coverage, follows):
+        if stats is not None:
+            channel = held.entry["channel"]
+            stats[channel] = stats.get(channel, 0) + 1
+        return
+    yield held.entry
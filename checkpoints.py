@@ -0,0 +1,119 @@
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+# Unfinished checkpoints older than this are deleted when the store starts
+CHECKPOINT_MAX_AGE_DAYS = 7
+
+
+def default_checkpoint_dir():
+    return Path.home() / ".cache" / "mkv2transcript" / "checkpoints"
+
+
+class ChannelCheckpoint:
+    """
+    Append-only JSONL log of the segments transcribed so far for one channel.
+
+    Every segment is flushed as soon as it is produced, so a crash loses at
+    most the line being written; a torn last line is ignored on load. Once
+    closed, a checkpoint ignores further segments, so a channel still being
+    decoded on another thread cannot reopen and overwrite it.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = []
+        self._file = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Read the committed segments; returns them in timeline order"""
+        self.entries = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self.entries.append(json.loads(line))
+                    except ValueError:
+                        break
+        except OSError:
+            pass
+        return self.entries
+
+    @property
+    def last_end(self):
+        """Timestamp up to which this channel has been transcribed"""
+        return self.entries[-1]["end"] if self.entries else 0.0
+
+    def append(self, entry):
+        with self._lock:
+            if self._closed:
+                return
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                # Rewrite what was loaded, which also drops a torn last line
+                self._file = open(self.path, "w", encoding="utf-8")
+                for old in self.entries:
+                    self._file.write(json.dumps(old, ensure_ascii=False) + "\n")
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class CheckpointStore:
+    """
+    Checkpoints of unfinished transcriptions, one directory per job key (the
+    transcript cache key of the source and its settings) holding a file per
+    channel. A key is only checkpointed by one job at a time; a second job
+    for the same key runs without checkpoints.
+    """
+
+    def __init__(self, directory=None, max_age_days=CHECKPOINT_MAX_AGE_DAYS):
+        self.directory = Path(directory) if directory else default_checkpoint_dir()
+        self._active = set()
+        self._lock = threading.Lock()
+        self.prune(max_age_days)
+
+    def acquire(self, key):
+        """Claim a key; returns False while another job holds it"""
+        with self._lock:
+            if key in self._active:
+                return False
+            self._active.add(key)
+            return True
+
+    def release(self, key):
+        with self._lock:
+            self._active.discard(key)
+
+    def channel(self, key, channel):
+        checkpoint = ChannelCheckpoint(self.directory / key / f"{channel}.jsonl")
+        checkpoint.load()
+        return checkpoint
+
+    def discard(self, key):
+        """Delete the checkpoints of a finished transcription"""
+        shutil.rmtree(self.directory / key, ignore_errors=True)
+
+    def prune(self, max_age_days):
+        cutoff = time.time() - max_age_days * 86400
+        try:
+            paths = list(self.directory.iterdir())
+        except OSError:
+            return
+        for path in paths:
+            try:
+                if path.is_dir() and os.stat(path).st_mtime < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                pass
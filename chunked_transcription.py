@@ -0,0 +1,225 @@
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from audio_io import WHISPER_SAMPLE_RATE
+from audio_analysis import compact_speech
+from model_registry import ModelRegistry, estimate_model_ram_mb, transcribe_audio
+
+
+def plan_chunks(regions, total_samples, chunk_samples, overlap_samples):
+    """
+    Split a channel's speech regions into chunks of at most chunk_samples of
+    speech, cutting in the silence between regions wherever possible.
+
+    A region longer than a chunk has to be cut mid-speech; those cuts get
+    overlap_samples of shared audio on both sides so words on the cut are
+    heard whole by at least one chunk. Each chunk owns the stretch of the
+    original timeline from own_start to own_end, and only the segments
+    centred in that stretch are kept, which removes the duplicates the
+    overlap produces.
+    Returns a list of (spans, own_start, own_end); spans are (start, end)
+    sample ranges of the original audio.
+    """
+    # Long regions are split into equal pieces; joined marks a mid-speech cut
+    pieces = []
+    for start, end in regions:
+        count = max(1, -(-(end - start) // chunk_samples))
+        step = (end - start) / count
+        for i in range(count):
+            piece_start = start + round(i * step)
+            piece_end = end if i == count - 1 else start + round((i + 1) * step)
+            pieces.append((piece_start, piece_end, i > 0))
+
+    groups = []
+    length = 0
+    for piece in pieces:
+        size = piece[1] - piece[0]
+        if groups and length + size <= chunk_samples:
+            groups[-1].append(piece)
+            length += size
+        else:
+            groups.append([piece])
+            length = size
+
+    chunks = []
+    for index, group in enumerate(groups):
+        spans = []
+        for start, end, joined in group:
+            if spans and joined:
+                spans[-1][1] = end
+            else:
+                spans.append([start, end])
+
+        first_start, _, first_joined = group[0]
+        if index == 0:
+            own_start = 0
+        elif first_joined:
+            own_start = first_start
+            spans[0][0] = max(groups[index - 1][-1][0], first_start - overlap_samples)
+        else:
+            own_start = (groups[index - 1][-1][1] + first_start) // 2
+
+        last_end = group[-1][1]
+        if index == len(groups) - 1:
+            own_end = total_samples
+        else:
+            next_start, next_end, next_joined = groups[index + 1][0]
+            if next_joined:
+                own_end = last_end
+                spans[-1][1] = min(next_end, last_end + overlap_samples)
+            else:
+                own_end = (last_end + next_start) // 2
+
+        chunks.append(([tuple(span) for span in spans], own_start, own_end))
+    return chunks
+
+
+# Model of this worker process, loaded by the first chunk it handles
+_worker_models = None
+
+
+def transcribe_chunk(model_settings, speech, timeline, options):
+    """
+    Runs in a pool process: transcribe one chunk's speech and return its
+    segments as (start, end, text) on the original timeline
+    """
+    global _worker_models
+    if _worker_models is None:
+        _worker_models = ModelRegistry(ram_budget_mb=0)
+    model = _worker_models.get(*model_settings)
+    segments, _ = transcribe_audio(model, speech, **options)
+    return [
+        (timeline.to_original(seg.start), timeline.to_original(seg.end, is_end=True), seg.text.strip())
+        for seg in segments
+    ]
+
+
+def default_chunk_workers(model_size, compute_type="int8", ram_budget_mb=4096):
+    """Two cores per worker, and no more workers than the model RAM budget holds"""
+    cores = os.cpu_count() or 1
+    by_ram = ram_budget_mb // max(1, estimate_model_ram_mb(model_size, compute_type))
+    return max(1, min(cores // 2, by_ram))
+
+
+class ChunkPool:
+    """
+    Process pool that transcribes the chunks of long channels side by side.
+
+    Every worker process loads its own copy of the model the first time it
+    is used and keeps it, so the pool is only rebuilt when a job asks for
+    different model settings. Jobs with the same settings share the pool; a
+    job with other settings waits until the jobs using it are done, so a
+    pool is never shut down under a running job and only one set of worker
+    models is ever in memory. Chunks are submitted a few at a time, so only
+    a bounded amount of audio is ever waiting to be pickled to the workers.
+    """
+
+    def __init__(self, workers, start_method="spawn"):
+        self.workers = max(1, workers)
+        self.start_method = start_method
+        self._executor = None
+        self._settings = None
+        self._users = 0
+        self._cond = threading.Condition()
+
+    def _acquire(self, model_settings, cancel_event=None):
+        """
+        The executor for model_settings, counted as in use until released;
+        None if cancel_event is set while waiting for other settings' jobs
+        """
+        with self._cond:
+            while self._executor is not None and self._settings != model_settings and self._users:
+                if cancel_event is not None and cancel_event.is_set():
+                    return None
+                self._cond.wait(0.5)
+            if self._executor is None or self._settings != model_settings:
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(self.start_method)
+                )
+                self._settings = model_settings
+            self._users += 1
+            return self._executor
+
+    def _release(self, executor):
+        with self._cond:
+            if self._executor is executor:
+                self._users -= 1
+                self._cond.notify_all()
+
+    def _reset(self, executor):
+        with self._cond:
+            if self._executor is executor:
+                self._executor = None
+                self._settings = None
+                self._users = 0
+                self._cond.notify_all()
+
+    def transcribe(self, audio, regions, model_settings, options, state,
+                   chunk_seconds=300, overlap_seconds=5.0, cancel_event=None):
+        """
+        Transcribe the speech regions of one channel in parallel chunks,
+        yielding (start, end, text) in timeline order.
+        model_settings are the ModelRegistry.get arguments used by each
+        worker. state gets the same progress keys as a single-call
+        transcription.
+        """
+        # Make sure every worker has a chunk, but keep chunks long enough
+        # that the model sees plenty of context
+        speech_samples = sum(end - start for start, end in regions)
+        chunk_samples = int(max(60, min(chunk_seconds, speech_samples / WHISPER_SAMPLE_RATE / self.workers)) * WHISPER_SAMPLE_RATE)
+        chunks = plan_chunks(regions, len(audio), chunk_samples, int(overlap_seconds * WHISPER_SAMPLE_RATE))
+
+        started = time.perf_counter()
+        executor = self._acquire(model_settings, cancel_event)
+        if executor is None:
+            return
+        progress_lock = threading.Lock()
+
+        def chunk_done(seconds):
+            def callback(future):
+                with progress_lock:
+                    state["position"] += seconds
+                    state["seconds"] = time.perf_counter() - started
+            return callback
+
+        pending = deque(chunks)
+        in_flight = deque()
+        last = None
+        try:
+            while pending or in_flight:
+                while pending and len(in_flight) < self.workers * 2:
+                    spans, own_start, own_end = pending.popleft()
+                    speech, timeline = compact_speech(audio, spans)
+                    future = executor.submit(transcribe_chunk, model_settings, speech, timeline, options)
+                    future.add_done_callback(chunk_done(len(speech) / WHISPER_SAMPLE_RATE))
+                    in_flight.append((future, own_start / WHISPER_SAMPLE_RATE, own_end / WHISPER_SAMPLE_RATE))
+
+                future, own_start, own_end = in_flight.popleft()
+                while not wait([future], timeout=0.5).done:
+                    if cancel_event is not None and cancel_event.is_set():
+                        return
+                for start, end, text in sorted(future.result()):
+                    # Keep only what this chunk owns, and drop a repeat of
+                    # the previous segment straddling a cut
+                    if not own_start <= (start + end) / 2 < own_end:
+                        continue
+                    if last and text == last[2] and start < last[1]:
+                        continue
+                    last = (start, end, text)
+                    yield last
+        except BrokenProcessPool:
+            self._reset(executor)
+            raise RuntimeError("A transcription worker process died (out of memory?)")
+        finally:
+            for future, _, _ in in_flight:
+                future.cancel()
+            self._release(executor)
+            state["seconds"] = time.perf_counter() - started
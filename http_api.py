@@ -0,0 +1,313 @@
+"""
+REST API served next to the web UI, so scripts can push recordings through
+without a browser session: submitting returns a job ID at once, the job is
+polled for its progress and its segments stream as server-sent events
+while it is transcribed.
+
+    POST   /api/jobs                   a recording under api_allowed_dirs as JSON
+                                       {"path", "speakers", "model", "format", "parallel_channels"},
+                                       or a multipart upload with a "file" field and the same fields
+    GET    /api/jobs                   every job
+    GET    /api/jobs/{id}              status, progress in percent, queue position and result
+    GET    /api/jobs/{id}/events       segments, progress and the outcome as server-sent events
+    GET    /api/jobs/{id}/transcript   the finished transcript
+    DELETE /api/jobs/{id}              cancel the job
+
+    curl -X POST localhost:7860/api/jobs -H 'Content-Type: application/json' \\
+         -d '{"path": "/data/Meetings/standup.mkv", "speakers": ["Me", "Team"]}'
+    curl -N localhost:7860/api/jobs/<id>/events
+"""
+import asyncio
+import json
+import shutil
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+
+import pipeline
+from batch import MEDIA_EXTENSIONS
+from pipeline import (
+    MODEL_CHOICES, OUTPUT_RETENTION_SECONDS, config, job_outputs_dir, probed_duration, transcribe_file
+)
+
+OUTPUT_FORMATS = ("md", "txt", "srt", "json")
+
+# How often an event stream checks its job for news
+EVENT_POLL_SECONDS = 0.5
+
+# Bytes copied per read when saving an upload
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Segments of a finished job are kept this long for event streams still
+# catching up; after that only the transcript file has them
+SEGMENT_RETENTION_SECONDS = 300
+
+router = APIRouter(prefix="/api")
+
+
+class ApiJob:
+    """
+    What the API keeps about a job it submitted: the segments written so
+    far, so event streams can start or resume at any point until they are
+    dropped a while after the job finished, and the latest progress
+    reported by the pipeline
+    """
+
+    def __init__(self, source_name, upload_dir=None):
+        self.source_name = source_name
+        self.upload_dir = upload_dir
+        self.output_file = None
+        self.progress = 0.0
+        # Index of the first segment still held, and the segments from there
+        self._segments = (0, [])
+
+    @property
+    def segment_count(self):
+        first, segments = self._segments
+        return first + len(segments)
+
+    def add_segments(self, segments):
+        self._segments[1].extend(segments)
+
+    def segments_from(self, index):
+        """(index, segment) for the segments held from index on"""
+        first, segments = self._segments
+        start = max(index, first)
+        return list(enumerate(segments[start - first:], start=start))
+
+    def drop_segments(self):
+        first, segments = self._segments
+        self._segments = (first + len(segments), [])
+
+
+# Jobs submitted through the API by job ID; forgotten with their outputs
+api_jobs = {}
+
+
+def allowed_dirs():
+    return [Path(folder).resolve() for folder in config.get("api_allowed_dirs", ["/data"])]
+
+
+def forget_expired_jobs():
+    now = time.time()
+    for job_id, record in list(api_jobs.items()):
+        job = pipeline.job_scheduler.get(job_id)
+        if job is None or (job.finished and job.finished_at < now - OUTPUT_RETENTION_SECONDS):
+            api_jobs.pop(job_id, None)
+        elif job.finished and job.finished_at < now - SEGMENT_RETENTION_SECONDS:
+            record.drop_segments()
+
+
+def resolve_source(path):
+    """The recording at path, refused unless it lies under api_allowed_dirs"""
+    source = Path(path).resolve()
+    if not any(source.is_relative_to(folder) for folder in allowed_dirs()):
+        raise HTTPException(403, f"{path} is outside the folders the API may read (api_allowed_dirs)")
+    if not source.is_file():
+        raise HTTPException(404, f"No recording at {path}")
+    return source
+
+
+async def save_upload(upload):
+    """Write an uploaded recording to its own temp folder, returning its path"""
+    name = Path(upload.filename or "upload").name
+    if Path(name).suffix.lower() not in MEDIA_EXTENSIONS:
+        raise HTTPException(400, f"Unsupported file type: {name}")
+    folder = Path(tempfile.gettempdir()) / "transcribe" / "uploads" / uuid.uuid4().hex[:12]
+    folder.mkdir(parents=True)
+    with open(folder / name, "wb") as f:
+        while chunk := await upload.read(UPLOAD_CHUNK_BYTES):
+            f.write(chunk)
+    return folder / name
+
+
+def speaker_list(value):
+    """Speaker names from a JSON list or a comma-separated form field"""
+    if value is None:
+        return pipeline.configured_speaker_names()
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, list) or not all(isinstance(name, str) for name in value):
+        raise HTTPException(400, '"speakers" must be a list of names or a comma-separated string')
+    return [name.strip() for name in value]
+
+
+def flag(value, default=False):
+    """A yes/no field: a JSON boolean, or "1", "true", "yes" or "on" from a form"""
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+
+def job_summary(job):
+    record = api_jobs[job.id]
+    progress = 1.0 if job.status == "done" else record.progress
+    return {
+        "id": job.id,
+        "status": job.status,
+        "source": record.source_name,
+        "progress": round(100 * progress, 1),
+        "queue_position": pipeline.job_scheduler.queue_position(job),
+        "segments": record.segment_count,
+        "submitted_at": job.submitted_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "error": job.error,
+        "result": job.result,
+        "status_url": f"/api/jobs/{job.id}",
+        "events_url": f"/api/jobs/{job.id}/events",
+        "transcript_url": f"/api/jobs/{job.id}/transcript" if job.status == "done" else None,
+    }
+
+
+def api_job(job_id):
+    job = pipeline.job_scheduler.get(job_id)
+    if job is None or job_id not in api_jobs:
+        raise HTTPException(404, f"No job {job_id}")
+    return job
+
+
+@router.post("/jobs", status_code=202)
+async def submit_job(request: Request):
+    """Queue a recording for transcription and return its job at once"""
+    upload_dir = None
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form = await request.form()
+        fields = {key: value for key, value in form.items() if key != "file"}
+        if form.get("file") is not None:
+            source = await save_upload(form["file"])
+            upload_dir = source.parent
+        elif fields.get("path"):
+            source = resolve_source(fields["path"])
+        else:
+            raise HTTPException(400, 'Send a recording as "file" or name one with "path"')
+    else:
+        try:
+            fields = await request.json()
+        except ValueError:
+            raise HTTPException(400, "Expected a JSON body or a multipart upload")
+        if not isinstance(fields, dict) or not fields.get("path"):
+            raise HTTPException(400, 'Name the recording with "path"')
+        source = resolve_source(fields["path"])
+
+    model_size = fields.get("model") or config.get("default_model", "tiny.en")
+    output_format = fields.get("format") or config.get("default_format", "md")
+    try:
+        if fields.get("model") and model_size not in MODEL_CHOICES:
+            raise HTTPException(400, f"model must be one of {', '.join(MODEL_CHOICES)}")
+        if output_format not in OUTPUT_FORMATS:
+            raise HTTPException(400, f"format must be one of {', '.join(OUTPUT_FORMATS)}")
+        speaker_names = speaker_list(fields.get("speakers"))
+    except HTTPException:
+        if upload_dir:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+        raise
+    parallel_channels = flag(fields.get("parallel_channels"), config.get("parallel_channels", False))
+
+    forget_expired_jobs()
+    outputs_dir = job_outputs_dir()
+    record = ApiJob(source.name, upload_dir)
+
+    def run(job):
+        output_dir = outputs_dir / job.id
+        output_dir.mkdir(exist_ok=True)
+        record.output_file = output_dir / f"{source.stem}_transcript.{output_format}"
+        try:
+            for event in transcribe_file(
+                source, speaker_names, record.output_file, model_size, output_format,
+                parallel_channels, scratch_dir=job.workspace, cancel_event=job.cancel_event
+            ):
+                record.add_segments(event.get("segments", ()))
+                record.progress = event.get("progress", record.progress)
+                yield event
+        finally:
+            if upload_dir:
+                shutil.rmtree(upload_dir, ignore_errors=True)
+
+    audio_seconds = await asyncio.to_thread(probed_duration, source)
+    job = pipeline.job_scheduler.submit(run, description=source.name, audio_seconds=audio_seconds)
+    api_jobs[job.id] = record
+    return job_summary(job)
+
+
+@router.get("/jobs")
+def list_jobs():
+    forget_expired_jobs()
+    jobs = [pipeline.job_scheduler.get(job_id) for job_id in list(api_jobs)]
+    return [job_summary(job) for job in jobs if job is not None]
+
+
+@router.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    return job_summary(api_job(job_id))
+
+
+@router.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    job = api_job(job_id)
+    if not pipeline.job_scheduler.cancel(job_id):
+        raise HTTPException(409, f"Job {job_id} has already {job.status}")
+    # A job cancelled in the queue never runs, so nothing else removes its upload
+    record = api_jobs[job_id]
+    if job.status == "cancelled" and record.upload_dir:
+        shutil.rmtree(record.upload_dir, ignore_errors=True)
+    return job_summary(job)
+
+
+@router.get("/jobs/{job_id}/transcript")
+def job_transcript(job_id: str):
+    job = api_job(job_id)
+    record = api_jobs[job_id]
+    if job.status != "done" or not (record.output_file and record.output_file.exists()):
+        return JSONResponse({"detail": f"Job {job_id} is {job.status}", "status": job.status}, status_code=409)
+    return FileResponse(record.output_file, filename=record.output_file.name)
+
+
+def sse(event, data, event_id=None):
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event}", f"data: {json.dumps(data, ensure_ascii=False)}"]
+    return "\n".join(lines) + "\n\n"
+
+
+@router.get("/jobs/{job_id}/events")
+def job_events(job_id: str, request: Request, after: int = -1):
+    """
+    Server-sent events: every segment as a "segment" event whose id is its
+    position in the transcript, "progress" whenever the status or progress
+    changes, and a final "done", "failed" or "cancelled" event with the job
+    summary. A client reconnecting with Last-Event-ID (or ?after=) only
+    gets the segments after that one. Segments of a job that finished more
+    than SEGMENT_RETENTION_SECONDS ago are no longer sent; its transcript
+    has them
+    """
+    job = api_job(job_id)
+    record = api_jobs[job_id]
+    last_event_id = request.headers.get("last-event-id", "")
+    sent = int(last_event_id) + 1 if last_event_id.isdigit() else max(after + 1, 0)
+
+    async def stream():
+        nonlocal sent
+        reported = None
+        while True:
+            # Read before sending, so a finished job's last segments go out too
+            finished = job.finished
+            for index, segment in record.segments_from(sent):
+                yield sse("segment", segment, index)
+            sent = max(sent, record.segment_count)
+            state = (job.status, round(100 * record.progress, 1), pipeline.job_scheduler.queue_position(job))
+            if finished:
+                yield sse(job.status, job_summary(job))
+                return
+            if state != reported:
+                reported = state
+                status, progress, position = state
+                yield sse("progress", {"status": status, "progress": progress, "queue_position": position})
+            await asyncio.sleep(EVENT_POLL_SECONDS)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
@@ -0,0 +1,218 @@
+import os
+import sys
+import threading
+import time
+import weakref
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# How often a running stage samples the resident memory
+RSS_SAMPLE_INTERVAL = 0.1
+
+
+def peak_rss_bytes():
+    """High-water mark of this process's resident memory"""
+    if resource is None:
+        return 0
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return usage if sys.platform == "darwin" else usage * 1024
+
+
+def current_rss_bytes():
+    """Resident memory of this process right now"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return peak_rss_bytes()
+
+
+def process_age_seconds():
+    """Seconds since this process was started, or None without /proc"""
+    try:
+        with open("/proc/self/stat", "r") as f:
+            # Fields after the command name, which may itself contain spaces
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime", "r") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def cpu_seconds():
+    """CPU time of this process and its finished children (ffmpeg)"""
+    total = time.process_time()
+    if resource is not None:
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        total += children.ru_utime + children.ru_stime
+    return total
+
+
+class _RssWatch:
+    """Highest resident memory seen since the watch was started"""
+
+    def __init__(self):
+        self.peak = current_rss_bytes()
+
+    def stop(self):
+        _monitor.unwatch(self)
+        return max(self.peak, current_rss_bytes())
+
+
+class _RssMonitor:
+    """
+    One sampling thread per process that feeds every active watch; it exits
+    when nothing is being watched. Watches are held weakly, so a stage that
+    never got stopped (its job raised) cannot keep the thread alive.
+    """
+
+    def __init__(self):
+        self._watches = weakref.WeakSet()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def watch(self):
+        watch = _RssWatch()
+        with self._lock:
+            self._watches.add(watch)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="rss-monitor", daemon=True)
+                self._thread.start()
+        return watch
+
+    def unwatch(self, watch):
+        with self._lock:
+            self._watches.discard(watch)
+
+    def _run(self):
+        while True:
+            time.sleep(RSS_SAMPLE_INTERVAL)
+            with self._lock:
+                watches = list(self._watches)
+                if not watches:
+                    self._thread = None
+                    return
+            rss = current_rss_bytes()
+            for watch in watches:
+                watch.peak = max(watch.peak, rss)
+            del watches
+
+
+_monitor = _RssMonitor()
+
+
+class StageTimer:
+    """
+    Wall time, CPU time and peak resident memory of the stages of one
+    transcription, which run one after the other: start() ends the current
+    stage and begins the next. CPU time and memory are measured for the
+    whole process, so jobs running side by side show up in each other's
+    numbers.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self._current = None
+
+    def start(self, name):
+        self.stop()
+        self._current = (name, _monitor.watch(), time.perf_counter(), cpu_seconds())
+
+    def stop(self):
+        if self._current is None:
+            return
+        name, watch, wall_started, cpu_started = self._current
+        self._current = None
+        peak = watch.stop()
+        record = self.stages.setdefault(name, {"wall_seconds": 0.0, "cpu_seconds": 0.0, "peak_rss_mb": 0.0})
+        record["wall_seconds"] += time.perf_counter() - wall_started
+        record["cpu_seconds"] += cpu_seconds() - cpu_started
+        record["peak_rss_mb"] = max(record["peak_rss_mb"], peak / 1024 ** 2)
+
+    @property
+    def peak_rss_mb(self):
+        return max((record["peak_rss_mb"] for record in self.stages.values()), default=0.0)
+
+    def summary(self):
+        return {
+            "stages": {
+                name: {key: round(value, 3 if key != "peak_rss_mb" else 1) for key, value in record.items()}
+                for name, record in self.stages.items()
+            },
+            "peak_rss_mb": round(self.peak_rss_mb, 1),
+        }
+
+    def format(self):
+        stages = " | ".join(
+            f"{name.replace('_', ' ')} {record['wall_seconds']:.1f}s" for name, record in self.stages.items()
+        )
+        return f"{stages} (peak RSS {self.peak_rss_mb:.0f} MB)"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+class MetricsRegistry:
+    """
+    Minimal Prometheus metrics store rendered in the text exposition format.
+
+    Counters and gauges hold one value per label set; summaries keep a _sum
+    and _count. Collectors are called at scrape time and return
+    (name, value, labels) samples for gauges that mirror live state.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._values = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def describe(self, name, metric_type, help_text):
+        self._metrics[name] = (metric_type, help_text)
+
+    def inc(self, name, value=1.0, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._values[(name, tuple(sorted(labels.items())))] = float(value)
+
+    def observe(self, name, value, **labels):
+        self.inc(f"{name}_sum", value, **labels)
+        self.inc(f"{name}_count", 1, **labels)
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+        for collector in self._collectors:
+            for name, value, labels in collector():
+                values[(name, tuple(sorted(labels.items())))] = float(value)
+
+        lines = []
+        for name, (metric_type, help_text) in self._metrics.items():
+            samples = sorted(
+                (key, value) for key, value in values.items()
+                if key[0] == name or (metric_type == "summary" and key[0] in (f"{name}_sum", f"{name}_count"))
+            )
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for (sample_name, labels), value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {value!r}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,228 @@
+import itertools
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+
+# Progress events kept per job for late subscribers
+EVENT_HISTORY = 200
+
+# Finished jobs are forgotten this long after they ended
+JOB_RETENTION_SECONDS = 24 * 3600
+
+
+def default_max_concurrent_jobs():
+    """
+    Size the job limit to the machine: a transcription wants about four
+    cores and up to 3 GB of RAM (model plus decoded audio)
+    """
+    cores = os.cpu_count() or 1
+    try:
+        ram_gb = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 1024 ** 3
+    except (AttributeError, ValueError, OSError):
+        ram_gb = 8
+    return max(1, min(cores // 4, int(ram_gb // 3)))
+
+
+class Job:
+    """
+    One queued or running transcription.
+
+    run(job) returns an iterable of progress events; it gets the job so it
+    can use job.workspace for scratch files and stop when job.cancel_event
+    is set. Events are kept in a bounded history that consumers follow.
+    """
+
+    def __init__(self, run, description="", audio_seconds=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.run = run
+        self.description = description
+        self.audio_seconds = audio_seconds
+        self.status = "queued"
+        self.error = None
+        self.result = None
+        self.workspace = None
+        self.cancel_event = threading.Event()
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._events = deque(maxlen=EVENT_HISTORY)
+        self._event_count = 0
+        self._cond = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    def emit(self, event):
+        with self._cond:
+            self._events.append(event)
+            self._event_count += 1
+            if "result" in event:
+                self.result = event["result"]
+            self._cond.notify_all()
+
+    def _set_status(self, status, error=None):
+        with self._cond:
+            self.status = status
+            self.error = error
+            if status == "running":
+                self.started_at = time.time()
+            elif self.finished:
+                self.finished_at = time.time()
+            self._cond.notify_all()
+
+    def wait_until_started(self, timeout=None):
+        """Block until the job leaves the queue; returns False on timeout"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.status != "queued", timeout)
+
+    def wait(self, timeout=None):
+        """Block until the job has finished; returns False on timeout"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.finished, timeout)
+
+    def follow(self, start=0):
+        """
+        Yield (index, event) for events from index start onwards as they
+        arrive, until the job has finished. Events older than the history
+        are skipped.
+        """
+        index = start
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._event_count > index or self.finished)
+                first = self._event_count - len(self._events)
+                index = max(index, first)
+                new = list(itertools.islice(self._events, index - first, None))
+                finished = self.finished and self._event_count <= index + len(new)
+            for event in new:
+                yield index, event
+                index += 1
+            if finished:
+                return
+
+
+class JobScheduler:
+    """
+    Runs jobs in FIFO order with at most max_concurrent_jobs at a time.
+
+    Each job gets its own workspace directory under workspace_root, which is
+    deleted when the job ends however it ends. Jobs can be cancelled while
+    queued or running. Finished jobs stay available for retention_seconds,
+    and are dropped as new ones are submitted.
+    """
+
+    def __init__(self, max_concurrent_jobs=None, workspace_root=None, retention_seconds=JOB_RETENTION_SECONDS):
+        self.max_concurrent_jobs = max_concurrent_jobs or default_max_concurrent_jobs()
+        self.workspace_root = Path(workspace_root or Path(tempfile.gettempdir()) / "transcribe" / "jobs")
+        self.retention_seconds = retention_seconds
+        self.jobs = {}
+        self._pending = deque()
+        self._running = 0
+        self._cond = threading.Condition()
+        for i in range(self.max_concurrent_jobs):
+            threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True).start()
+
+    def submit(self, run, description="", audio_seconds=None):
+        """
+        Queue run(job) for execution; audio_seconds, the probed length of
+        the recording, lets waiting jobs see how much work is ahead of them
+        """
+        job = Job(run, description, audio_seconds)
+        with self._cond:
+            self._forget_expired()
+            self.jobs[job.id] = job
+            self._pending.append(job)
+            self._cond.notify()
+        return job
+
+    def _forget_expired(self):
+        cutoff = time.time() - self.retention_seconds
+        expired = [job_id for job_id, job in self.jobs.items() if job.finished and job.finished_at < cutoff]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def queue_position(self, job):
+        """1-based position in the queue, or 0 once the job has started"""
+        with self._cond:
+            try:
+                return self._pending.index(job) + 1
+            except ValueError:
+                return 0
+
+    def audio_ahead(self, job):
+        """Seconds of audio in running jobs and jobs queued before this one"""
+        with self._cond:
+            running = [j for j in self.jobs.values() if j.status == "running"]
+            try:
+                queued = list(self._pending)[:self._pending.index(job)]
+            except ValueError:
+                queued = []
+        return sum(j.audio_seconds or 0.0 for j in running + queued)
+
+    def queue_info(self):
+        with self._cond:
+            return {"queued": len(self._pending), "running": self._running, "limit": self.max_concurrent_jobs}
+
+    def cancel(self, job_id):
+        """Cancel a job; returns False if there is no such unfinished job"""
+        job = self.jobs.get(job_id)
+        if not job or job.finished:
+            return False
+        job.cancel_event.set()
+        with self._cond:
+            if job in self._pending:
+                self._pending.remove(job)
+                job._set_status("cancelled")
+        return True
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+                job = self._pending.popleft()
+                self._running += 1
+            try:
+                self._run(job)
+            finally:
+                with self._cond:
+                    self._running -= 1
+
+    def _run(self, job):
+        if job.cancel_event.is_set():
+            job._set_status("cancelled")
+            return
+
+        job.workspace = self.workspace_root / job.id
+        job._set_status("running")
+        status, error = "done", None
+        events = None
+        try:
+            # Inside the try, so a workspace that can't be created fails the
+            # job instead of the worker thread
+            job.workspace.mkdir(parents=True, exist_ok=True)
+            events = iter(job.run(job))
+            for event in events:
+                job.emit(event)
+                if job.cancel_event.is_set():
+                    raise InterruptedError("Job cancelled")
+        except Exception as e:
+            if job.cancel_event.is_set():
+                status = "cancelled"
+            else:
+                status, error = "failed", str(e)
+        finally:
+            close = getattr(events, "close", None)
+            if close:
+                close()
+            # Clean up before reporting, so a finished job never has a workspace
+            shutil.rmtree(job.workspace, ignore_errors=True)
+            job._set_status(status, error)
@@ -0,0 +1,211 @@
+import heapq
+import subprocess
+import threading
+import time
+
+import numpy as np
+
+from audio_analysis import compact_speech, detect_speech_regions
+from audio_io import PCM_FORMATS, READ_FRAMES, WHISPER_SAMPLE_RATE, build_channel_filter, channel_names
+
+# A recording that has not grown for this long is taken to be closed
+IDLE_SECONDS = 15
+
+# Audio gathered per channel before a window is transcribed; a window ends
+# in the first pause after that, or mid-speech at MAX_WINDOW_SECONDS
+WINDOW_SECONDS = 30
+MAX_WINDOW_SECONDS = 90
+
+# Speech this close to the end of what has been decoded may still go on,
+# so windows are never cut there
+TAIL_GUARD_SECONDS = 2
+
+# Bytes of the growing file handed to ffmpeg per read
+FEED_BYTES = 1024 * 1024
+
+
+def follow_bytes(path, idle_seconds=IDLE_SECONDS, cancel_event=None, poll_seconds=0.5):
+    """
+    Yield the contents of a file as it is written, until it has not grown
+    for idle_seconds
+    """
+    with open(path, "rb") as f:
+        idle_since = time.monotonic()
+        while cancel_event is None or not cancel_event.is_set():
+            data = f.read(FEED_BYTES)
+            if data:
+                idle_since = time.monotonic()
+                yield data
+            elif time.monotonic() - idle_since >= idle_seconds:
+                return
+            else:
+                time.sleep(poll_seconds)
+
+
+def decode_growing(path, media, idle_seconds=IDLE_SECONDS, cancel_event=None, sample_format="s16le"):
+    """
+    Decode a recording that is still being written with one ffmpeg process
+    fed through stdin, yielding float32 blocks of (frames, channels) as soon
+    as ffmpeg produces them; ends once the file stops growing
+    """
+    dtype, scale = PCM_FORMATS[sample_format]
+    channels = len(channel_names(media))
+
+    process = subprocess.Popen([
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-i", "pipe:0",
+        "-filter_complex", build_channel_filter(media),
+        "-map", "[out]",
+        "-f", sample_format,
+        "-ar", str(WHISPER_SAMPLE_RATE),
+        "pipe:1"
+    ], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    # Set when decoding ends early, so the feeder stops waiting for more data
+    stopped = threading.Event()
+
+    def feed():
+        try:
+            for data in follow_bytes(path, idle_seconds, stopped):
+                process.stdin.write(data)
+        except (BrokenPipeError, OSError):
+            pass
+        finally:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+
+    stderr_chunks = []
+    threads = [
+        threading.Thread(target=feed, name="live-feed", daemon=True),
+        threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    frame_bytes = dtype.itemsize * channels
+    chunk = bytearray(READ_FRAMES * frame_bytes)
+    view = memoryview(chunk)
+    pending = 0
+    finished = False
+    try:
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                raise InterruptedError("Transcription cancelled")
+            read = process.stdout.readinto(view[pending:])
+            if not read:
+                finished = True
+                break
+            pending += read
+            usable = pending - pending % frame_bytes
+            if not usable:
+                continue
+            frames = np.frombuffer(chunk, dtype=dtype, count=usable // dtype.itemsize)
+            yield frames.reshape(-1, channels).astype(np.float32) * scale
+            leftover = pending - usable
+            view[:leftover] = view[usable:pending]
+            pending = leftover
+    finally:
+        stopped.set()
+        process.stdout.close()
+        if not finished:
+            process.kill()
+        returncode = process.wait()
+        for thread in threads:
+            thread.join()
+
+    if returncode != 0:
+        stderr = b"".join(stderr_chunks).decode("utf-8", errors="replace")
+        raise RuntimeError(f"Error decoding the growing recording: {stderr}")
+
+
+def choose_cut(audio, window_samples, max_window_samples, guard_samples):
+    """
+    Where to end the next window of a channel's undecided audio, in samples:
+    the latest pause after window_samples and before the guard, or a forced
+    cut once max_window_samples is reached; None to wait for more audio
+    """
+    if len(audio) < window_samples:
+        return None
+    limit = len(audio) - guard_samples
+    regions = detect_speech_regions(audio)
+    if not regions:
+        return limit
+    pauses = [(end + start) // 2 for (_, end), (start, _) in zip(regions, regions[1:])]
+    pauses.append((regions[-1][1] + len(audio)) // 2 if regions[-1][1] < limit else None)
+    cuts = [cut for cut in pauses if cut is not None and window_samples // 2 <= cut <= limit]
+    if cuts:
+        return max(cuts)
+    if len(audio) >= max_window_samples:
+        return limit
+    return None
+
+
+def rolling_windows(blocks, window_seconds=WINDOW_SECONDS, max_window_seconds=MAX_WINDOW_SECONDS,
+                    guard_seconds=TAIL_GUARD_SECONDS):
+    """
+    Split decoded blocks into per-channel windows cut at pauses
+    Yields (channel_index, start_seconds, audio); every channel's windows
+    follow each other without gaps, and whatever is left when the blocks
+    end becomes each channel's final window
+    """
+    window_samples = int(window_seconds * WHISPER_SAMPLE_RATE)
+    max_window_samples = int(max_window_seconds * WHISPER_SAMPLE_RATE)
+    guard_samples = int(guard_seconds * WHISPER_SAMPLE_RATE)
+    pending = None
+    offsets = None
+    for block in blocks:
+        if pending is None:
+            pending = [np.zeros(0, dtype=np.float32) for _ in range(block.shape[1])]
+            offsets = [0] * block.shape[1]
+        for index in range(block.shape[1]):
+            pending[index] = np.concatenate((pending[index], block[:, index]))
+            while True:
+                cut = choose_cut(pending[index], window_samples, max_window_samples, guard_samples)
+                if cut is None:
+                    break
+                yield index, offsets[index] / WHISPER_SAMPLE_RATE, pending[index][:cut]
+                pending[index] = pending[index][cut:]
+                offsets[index] += cut
+    for index, audio in enumerate(pending or []):
+        if len(audio):
+            yield index, offsets[index] / WHISPER_SAMPLE_RATE, audio
+
+
+def transcribe_window(transcribe, audio, energy_gate=True):
+    """
+    Transcribe one window, skipping its silence; transcribe(audio) returns
+    faster-whisper segments. Returns (start, end, text) relative to the window
+    """
+    regions = detect_speech_regions(audio) if energy_gate else [(0, len(audio))]
+    if not regions:
+        return []
+    speech, timeline = compact_speech(audio, regions)
+    return [
+        (timeline.to_original(seg.start), timeline.to_original(seg.end, is_end=True), seg.text.strip())
+        for seg in transcribe(speech)
+    ]
+
+
+def live_segments(windows, transcribe, channels, energy_gate=True):
+    """
+    Transcribe rolling windows and yield (channel_index, start, end, text)
+    in timeline order: a segment is released once every channel has been
+    transcribed past its start, so no earlier one can still arrive
+    """
+    transcribed_until = [0.0] * channels
+    waiting = []
+    order = 0
+    for index, start, audio in windows:
+        for seg_start, seg_end, text in transcribe_window(transcribe, audio, energy_gate):
+            heapq.heappush(waiting, (start + seg_start, order, index, start + seg_end, text))
+            order += 1
+        transcribed_until[index] = start + len(audio) / WHISPER_SAMPLE_RATE
+        watermark = min(transcribed_until)
+        while waiting and waiting[0][0] < watermark:
+            seg_start, _, index_out, seg_end, text = heapq.heappop(waiting)
+            yield index_out, seg_start, seg_end, text
+    while waiting:
+        seg_start, _, index_out, seg_end, text = heapq.heappop(waiting)
+        yield index_out, seg_start, seg_end, text
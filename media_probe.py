@@ -0,0 +1,140 @@
+import json
+import os
+import subprocess
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+
+@dataclass(frozen=True)
+class AudioStream:
+    """One audio stream of a media file as reported by ffprobe"""
+    index: int
+    codec: str
+    channels: int
+    sample_rate: int
+    duration: float = None
+    language: str = None
+    title: str = None
+
+
+@dataclass(frozen=True)
+class MediaInfo:
+    """What a recording contains, parsed from ffprobe's JSON output"""
+    path: str
+    container: str
+    duration: float = None
+    size: int = 0
+    audio_streams: tuple = field(default_factory=tuple)
+    video_streams: int = 0
+    other_streams: int = 0
+
+    @property
+    def audio_track_count(self):
+        return len(self.audio_streams)
+
+
+def parse_duration(value):
+    """ffprobe durations are seconds as strings; Matroska tags use HH:MM:SS.fraction"""
+    if value in (None, "", "N/A"):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        hours, minutes, seconds = str(value).split(":")
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    except ValueError:
+        return None
+
+
+def parse_probe_output(path, data):
+    """Build a MediaInfo from the parsed ffprobe -print_format json output"""
+    audio_streams = []
+    video_streams = 0
+    other_streams = 0
+    for stream in data.get("streams", []):
+        codec_type = stream.get("codec_type")
+        tags = {key.lower(): value for key, value in (stream.get("tags") or {}).items()}
+        if codec_type == "audio":
+            audio_streams.append(AudioStream(
+                index=int(stream.get("index", len(audio_streams))),
+                codec=stream.get("codec_name", "unknown"),
+                channels=int(stream.get("channels") or 0),
+                sample_rate=int(stream.get("sample_rate") or 0),
+                duration=parse_duration(stream.get("duration")) or parse_duration(tags.get("duration")),
+                language=tags.get("language"),
+                title=tags.get("title"),
+            ))
+        elif codec_type == "video" and not (stream.get("disposition") or {}).get("attached_pic"):
+            video_streams += 1
+        else:
+            # Subtitles, data, attachments and cover art
+            other_streams += 1
+
+    media_format = data.get("format", {})
+    duration = parse_duration(media_format.get("duration"))
+    if duration is None:
+        durations = [s.duration for s in audio_streams if s.duration]
+        duration = max(durations) if durations else None
+
+    return MediaInfo(
+        path=str(path),
+        container=media_format.get("format_name", "unknown"),
+        duration=duration,
+        size=int(media_format.get("size") or 0),
+        audio_streams=tuple(audio_streams),
+        video_streams=video_streams,
+        other_streams=other_streams,
+    )
+
+
+def probe_media(path):
+    """
+    Read the stream layout of a media file with ffprobe; only the container
+    headers are parsed, so this is fast even for multi-GB recordings
+    """
+    result = subprocess.run([
+        "ffprobe", "-v", "error",
+        "-print_format", "json",
+        "-show_format", "-show_streams",
+        str(path)
+    ], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Could not read media file: {result.stderr.strip()}")
+    return parse_probe_output(path, json.loads(result.stdout or "{}"))
+
+
+class MediaProbe:
+    """
+    ffprobe results cached by path, size and mtime, so the queue, progress
+    reporting and decoding all share one probe per file version.
+    Holds at most max_entries descriptors, dropping the least recently used.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def probe(self, path):
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            info = self._cache.get(key)
+            if info is not None:
+                self._cache.move_to_end(key)
+                return info
+
+        info = probe_media(path)
+        with self._lock:
+            self._cache[key] = info
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return info
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
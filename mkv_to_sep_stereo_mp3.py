@@ -1,13 +1,40 @@
+"""
+Turn OBS dual-track MKVs (Track 1 = mic, Track 2 = Meet) into one stereo
+file with the mic on the left and Meet on the right.
+
+Without arguments a file dialog asks for a single MKV. With paths it runs
+headless and converts every MKV found, several at a time:
+
+    python mkv_to_sep_stereo_mp3.py --codec opus --jobs 8 /data/Recordings
+"""
+import argparse
 import os
 import subprocess
 import sys
-import tempfile
-import tkinter as tk
-from tkinter import filedialog, simpledialog, messagebox
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from batch import discover_sources, is_up_to_date
+from instrumentation import cpu_seconds
+from media_probe import probe_media
 
 # Adjust if ffmpeg is not on PATH
 FFMPEG_BIN = "ffmpeg"
 
+# Output codecs: file extension, encoder arguments and default bitrate.
+# "copy" keeps both tracks bit for bit in an MKA instead of mixing them,
+# which a stereo mix cannot do without decoding.
+CODECS = {
+    "mp3": (".mp3", ["-c:a", "libmp3lame"], "192k"),
+    "opus": (".opus", ["-c:a", "libopus", "-application", "voip"], "64k"),
+    "flac": (".flac", ["-c:a", "flac"], None),
+    "copy": (".mka", ["-c:a", "copy"], None),
+}
+
+# Both tracks are mixed down to mono at this rate before being joined
+MIX_SAMPLE_RATE = 48000
+
 
 def run_ffmpeg(cmd_args):
     """Run ffmpeg command and raise on error."""
@@ -22,7 +49,108 @@ def run_ffmpeg(cmd_args):
     return result
 
 
-def main():
+def output_path(source, codec, output_dir=None):
+    extension = CODECS[codec][0]
+    return Path(output_dir or source.parent) / f"{source.stem}_combined{extension}"
+
+
+def build_command(source, output, codec="mp3", bitrate=None, tracks=2):
+    """
+    ffmpeg arguments converting source in one pass: Track 1 and Track 2 go
+    straight from the demuxer into a join filter, so nothing is encoded twice
+    A source with a single track is simply re-encoded (or copied)
+    """
+    extension, encoder, default_bitrate = CODECS[codec]
+    bitrate = bitrate or default_bitrate
+    args = ["-nostdin", "-y", "-v", "error", "-i", str(source), "-vn", "-sn", "-dn"]
+    if codec == "copy":
+        args += ["-map", "0:a:0"] + (["-map", "0:a:1", "-metadata:s:a:1", "title=Right"] if tracks >= 2 else [])
+        args += ["-metadata:s:a:0", "title=Left" if tracks >= 2 else "title=Audio"]
+    elif tracks >= 2:
+        mono = f"aformat=sample_rates={MIX_SAMPLE_RATE}:channel_layouts=mono"
+        args += [
+            "-filter_complex",
+            f"[0:a:0]{mono}[mic];[0:a:1]{mono}[meet];"
+            "[mic][meet]join=inputs=2:channel_layout=stereo:map=0.0-FL|1.0-FR[out]",
+            "-map", "[out]",
+        ]
+    else:
+        args += ["-map", "0:a:0", "-ac", "2"]
+    args += encoder + (["-b:a", bitrate] if bitrate else [])
+    return args + [str(output)]
+
+
+def convert_file(source, output, codec="mp3", bitrate=None):
+    """
+    Convert one recording; the output is written under a temporary name and
+    renamed when complete, so an interrupted run never leaves a partial file
+    Returns the recording's duration in seconds
+    """
+    media = probe_media(source)
+    if not media.audio_track_count:
+        raise ValueError("No audio tracks found")
+    if media.audio_track_count > 2:
+        print(f"⚠️ {source.name}: {media.audio_track_count} audio tracks, only the first two are kept", file=sys.stderr)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    partial = output.with_name(f"partial_{output.name}")
+    try:
+        run_ffmpeg(build_command(source, partial, codec, bitrate, media.audio_track_count))
+        os.replace(partial, output)
+    finally:
+        partial.unlink(missing_ok=True)
+    return media.duration or 0.0
+
+
+def convert_batch(sources, codec="mp3", bitrate=None, jobs=None, output_dir=None, force=False, log=print):
+    """
+    Convert many recordings side by side. The work happens in the ffmpeg
+    processes, so a thread per running conversion is enough to keep jobs
+    of them busy. Returns (converted, skipped, failed) counts.
+    """
+    jobs = max(1, jobs or os.cpu_count() or 1)
+    pending = []
+    skipped = 0
+    for source in sources:
+        output = output_path(source, codec, output_dir)
+        if not force and is_up_to_date(source, output):
+            skipped += 1
+        else:
+            pending.append((source, output))
+    log(f"📂 {len(sources)} recordings found: {len(pending)} to convert, {skipped} already up to date")
+
+    converted = []
+    failed = 0
+    started = time.perf_counter()
+    cpu_started = cpu_seconds()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            pool.submit(convert_file, source, output, codec, bitrate): (source, output)
+            for source, output in pending
+        }
+        for future in as_completed(futures):
+            source, output = futures[future]
+            try:
+                converted.append(future.result())
+            except Exception as e:
+                failed += 1
+                log(f"❌ {source.name}: {e}")
+                continue
+            log(f"✅ {source.name} → {output.name} ({len(converted) + failed}/{len(pending)})")
+
+    wall = time.perf_counter() - started
+    audio_hours = sum(converted) / 3600
+    log(
+        f"📊 Converted {len(converted)}, skipped {skipped}, failed {failed} | {audio_hours:.2f} audio hours "
+        f"in {wall / 60:.1f} min, {cpu_seconds() - cpu_started:.0f} CPU seconds"
+    )
+    return len(converted), skipped, failed
+
+
+def run_dialog():
+    """Pick one MKV and an output name in Tk dialogs and convert it to MP3"""
+    import tkinter as tk
+    from tkinter import filedialog, simpledialog, messagebox
+
     root = tk.Tk()
     root.withdraw()  # hide main window
 
@@ -55,47 +183,8 @@ def main():
     output_path = os.path.join(mkv_dir, output_name)
 
     try:
-        # 3) Create temporary directory for intermediate MP3s
-        with tempfile.TemporaryDirectory() as tmpdir:
-            mic_mp3 = os.path.join(tmpdir, "mic_tmp.mp3")
-            meet_mp3 = os.path.join(tmpdir, "meet_tmp.mp3")
-
-            # 3a) Extract Track 1 (mic) to mic_tmp.mp3
-            # 0:a:0 = first audio stream from MKV (Track 1)
-            run_ffmpeg([
-                "-y",
-                "-i", mkv_path,
-                "-map", "0:a:0",
-                "-ac", "2",
-                "-c:a", "libmp3lame",
-                "-b:a", "192k",
-                mic_mp3
-            ])
-
-            # 3b) Extract Track 2 (Meet) to meet_tmp.mp3
-            # 0:a:1 = second audio stream from MKV (Track 2)
-            run_ffmpeg([
-                "-y",
-                "-i", mkv_path,
-                "-map", "0:a:1",
-                "-ac", "2",
-                "-c:a", "libmp3lame",
-                "-b:a", "192k",
-                meet_mp3
-            ])
-
-            # 4) Combine them into one stereo MP3
-            # mic = left, meet = right
-            run_ffmpeg([
-                "-y",
-                "-i", mic_mp3,
-                "-i", meet_mp3,
-                "-filter_complex",
-                "join=inputs=2:channel_layout=stereo:map=0.0-FL|1.0-FR",
-                "-c:a", "libmp3lame",
-                "-b:a", "192k",
-                output_path
-            ])
+        # 3) Mic (Track 1) left, Meet (Track 2) right, in a single ffmpeg pass
+        convert_file(Path(mkv_path), Path(output_path), "mp3")
 
         messagebox.showinfo(
             "Done",
@@ -108,5 +197,27 @@ def main():
         print(e, file=sys.stderr)
 
 
+def main():
+    parser = argparse.ArgumentParser(description="Combine the two audio tracks of OBS recordings into one stereo file")
+    parser.add_argument("paths", nargs="*", metavar="PATH",
+                        help="MKV files, directories or glob patterns; without any a file dialog opens")
+    parser.add_argument("--codec", choices=sorted(CODECS), default="mp3",
+                        help="mp3, opus or flac stereo mix, or copy both tracks unchanged into an .mka")
+    parser.add_argument("--bitrate", help="Bitrate for mp3 (default 192k) and opus (default 64k)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Recordings converted at the same time")
+    parser.add_argument("--output-dir", help="Write outputs here instead of next to each recording")
+    parser.add_argument("--recursive", action="store_true", help="Also scan subdirectories")
+    parser.add_argument("--force", action="store_true", help="Convert again even if an up-to-date output exists")
+    args = parser.parse_args()
+
+    if not args.paths:
+        run_dialog()
+        return
+
+    sources = [source for source in discover_sources(args.paths, recursive=args.recursive) if source.suffix.lower() == ".mkv"]
+    _, _, failed = convert_batch(sources, args.codec, args.bitrate, args.jobs, args.output_dir, args.force)
+    sys.exit(1 if failed else 0)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,140 @@
+import threading
+from collections import OrderedDict
+
+# Rough resident size (MB) of each model once loaded with int8 weights on CPU.
+# Used only to decide when to evict; the numbers do not need to be exact.
+MODEL_RAM_ESTIMATES_MB = {
+    "tiny": 150,
+    "tiny.en": 150,
+    "base": 250,
+    "base.en": 250,
+    "small": 600,
+    "small.en": 600,
+    "medium": 1600,
+    "medium.en": 1600,
+    "large-v1": 3300,
+    "large-v2": 3300,
+    "large-v3": 3300,
+}
+
+# Multiplier over the int8 estimate for wider weight types
+COMPUTE_TYPE_RAM_FACTOR = {
+    "int8": 1.0,
+    "int8_float32": 1.0,
+    "int8_float16": 1.0,
+    "int16": 1.8,
+    "float16": 1.8,
+    "float32": 3.5,
+}
+
+
+def estimate_model_ram_mb(model_size, compute_type="int8"):
+    """Estimate how much RAM a loaded model occupies"""
+    base = MODEL_RAM_ESTIMATES_MB.get(model_size, 1600)
+    return int(base * COMPUTE_TYPE_RAM_FACTOR.get(compute_type, 1.0))
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded WhisperModel instances.
+
+    Models are keyed by (model_size, compute_type) so every job using a model
+    shares one instance; cpu_threads and num_workers only size it when it is
+    loaded, so callers should size it once for the whole process. When
+    the estimated RAM of the resident models exceeds the budget, the least
+    recently used models are dropped (the most recently requested one is
+    always kept). load(model_size, compute_type, cpu_threads, num_workers)
+    builds a model; by default it is a faster-whisper WhisperModel.
+    """
+
+    def __init__(self, ram_budget_mb=4096, load=None):
+        self.ram_budget_mb = ram_budget_mb
+        if load is not None:
+            self._load = load
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def _load(self, model_size, compute_type, cpu_threads, num_workers):
+        # Imported here so merely creating the registry stays cheap
+        from faster_whisper import WhisperModel
+
+        return WhisperModel(
+            model_size,
+            device="cpu",
+            compute_type=compute_type,
+            cpu_threads=cpu_threads,
+            num_workers=num_workers
+        )
+
+    def is_loaded(self, model_size, compute_type="int8"):
+        with self._lock:
+            return (model_size, compute_type) in self._models
+
+    def get(self, model_size, compute_type="int8", cpu_threads=0, num_workers=1):
+        """Return a shared model instance, loading it on first use"""
+        key = (model_size, compute_type)
+
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Only one thread loads a given key; others wait for it here
+        with key_lock:
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    return self._models[key]
+
+            model = self._load(model_size, compute_type, cpu_threads, num_workers)
+
+            with self._lock:
+                self._models[key] = model
+                self._evict(keep=key)
+            return model
+
+    def _evict(self, keep):
+        """Drop least recently used models until under the RAM budget"""
+        if not self.ram_budget_mb:
+            return
+        while len(self._models) > 1 and self.resident_ram_mb() > self.ram_budget_mb:
+            oldest = next(iter(self._models))
+            if oldest == keep:
+                break
+            # Jobs still holding a reference keep the model alive until they finish
+            del self._models[oldest]
+            print(f"♻️ Evicted model {oldest[0]} ({oldest[1]}) to stay under {self.ram_budget_mb} MB")
+
+    def resident_ram_mb(self):
+        return sum(estimate_model_ram_mb(key[0], key[1]) for key in self._models)
+
+    def loaded_models(self):
+        with self._lock:
+            return list(self._models)
+
+    def preload(self, model_size, compute_type="int8", cpu_threads=0, num_workers=1):
+        """Load a model in a background thread so the first job finds it warm"""
+        def _worker():
+            try:
+                self.get(model_size, compute_type, cpu_threads, num_workers)
+                print(f"✓ Preloaded model: {model_size}")
+            except Exception as e:
+                print(f"⚠️ Warning: Could not preload model {model_size}: {e}")
+
+        thread = threading.Thread(target=_worker, name=f"preload-{model_size}", daemon=True)
+        thread.start()
+        return thread
+
+
+def transcribe_audio(model, audio, batch_size=0, **options):
+    """
+    model.transcribe, or faster-whisper's batched pipeline when batch_size is
+    set; batching decodes several VAD chunks at once, so it needs vad_filter
+    """
+    if batch_size and options.get("vad_filter", True):
+        from faster_whisper import BatchedInferencePipeline
+
+        return BatchedInferencePipeline(model=model).transcribe(audio, batch_size=batch_size, **options)
+    return model.transcribe(audio, **options)
@@ -0,0 +1,1011 @@
+"""
+The transcription pipeline without any UI: configuration, the shared
+model, cache, checkpoint and metrics instances, and the functions that
+transcribe a recording. Importing it is cheap; faster-whisper is loaded
+with the first model and the web UI lives in ui.py.
+"""
+import os
+from pathlib import Path
+import json
+import shutil
+import tempfile
+import time
+import heapq
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from model_registry import ModelRegistry, transcribe_audio
+from audio_io import WHISPER_SAMPLE_RATE, channel_names, load_channels
+from media_probe import MediaProbe
+from chunked_transcription import ChunkPool, default_chunk_workers
+from audio_analysis import compact_speech, compare_channels, detect_speech_regions
+from transcript_cache import TranscriptCache, cache_key
+from transcript_index import TranscriptIndex
+from checkpoints import CheckpointStore
+from instrumentation import MetricsRegistry, StageTimer, current_rss_bytes
+from transcript_writers import open_transcript_writer, render_preview
+from job_scheduler import JobScheduler
+from autotune import load_tuned_profiles, tuned_profile
+from watch_folder import FolderWatcher, WatchState
+from live_tail import decode_growing, live_segments, rolling_windows
+from bleed import bleed_regions, follows_envelope, level_db, subtract_regions, suppress_bleed
+
+CONFIG_PATH = Path(__file__).parent / "transcribe_config.json"
+
+# Finished transcripts of UI and API jobs are kept this long for download
+OUTPUT_RETENTION_SECONDS = 24 * 3600
+
+# Channels of one job the shared model is sized to decode at once
+MODEL_CHANNELS = 2
+
+# Models offered in the UI; the API accepts no others
+MODEL_CHOICES = ("tiny.en", "base.en", "small.en", "medium.en", "large-v2")
+
+def load_config():
+    """Load optional user configuration from same directory as script"""
+    config_path = CONFIG_PATH
+    
+    default_config = {
+        "default_model": "tiny.en",
+        "default_format": "md",
+        "default_left_speaker": "",
+        "default_right_speaker": "",
+        "compute_type": "int8",
+        "cpu_threads": 0,
+        "beam_size": 5,
+        "batch_size": 0,
+        "tuned_profiles_file": "",
+        "model_ram_budget_mb": 4096,
+        "preload_model": True,
+        "audio_in_memory_max_minutes": 90,
+        "parallel_channels": False,
+        "energy_gate": True,
+        "energy_gate_margin_db": 10,
+        "vad_filter": True,
+        "bleed_filter": True,
+        "bleed_mask": False,
+        "bleed_margin_db": 6,
+        "cache_enabled": True,
+        "cache_dir": "",
+        "cache_max_mb": 500,
+        "index_enabled": True,
+        "index_db": "",
+        "batch_workers": 2,
+        "max_concurrent_jobs": 0,
+        "chunk_workers": 0,
+        "chunk_min_minutes": 20,
+        "chunk_seconds": 300,
+        "chunk_overlap_seconds": 5,
+        "checkpoint_enabled": True,
+        "checkpoint_dir": "",
+        "watch_folders": [],
+        "watch_recursive": False,
+        "watch_priority": "shortest",
+        "watch_workers": 1,
+        "watch_settle_seconds": 30,
+        "watch_poll_seconds": 10,
+        "watch_state_db": "",
+        "watch_live_tail": True,
+        "live_window_seconds": 30,
+        "live_idle_seconds": 15,
+        "live_max_jobs": 2,
+        "api_allowed_dirs": ["/data"]
+    }
+    
+    if config_path.exists():
+        try:
+            with open(config_path, 'r') as f:
+                user_config = json.load(f)
+            # Merge user config with defaults
+            default_config.update(user_config)
+            print(f"✓ Loaded config from: {config_path}")
+        except Exception as e:
+            print(f"⚠️ Warning: Could not load config file: {e}")
+
+    # Profiles saved by --autotune win over any written into the config
+    default_config["tuned_profiles"] = {
+        **(default_config.get("tuned_profiles") or {}),
+        **load_tuned_profiles(default_config["tuned_profiles_file"] or None)
+    }
+    
+    return default_config
+
+def model_worker_settings(model_size):
+    """
+    Return (compute_type, cpu_threads, num_workers) for the shared model
+    It is sized once for the whole process, whatever the job: one worker
+    for each channel that can be decoded at the same time (MODEL_CHANNELS
+    for every job the scheduler runs at once), with the configured (or
+    tuned) CPU threads split across those workers
+    """
+    profile = tuned_profile(config, model_size)
+    compute_type = profile["compute_type"]
+    cpu_threads = profile["cpu_threads"]
+    concurrent_jobs = job_scheduler.max_concurrent_jobs if job_scheduler else 1
+    num_workers = MODEL_CHANNELS * max(1, concurrent_jobs)
+    total_threads = cpu_threads or os.cpu_count() or 1
+    return compute_type, max(1, total_threads // num_workers), num_workers
+
+def transcribe_options(model_size):
+    """Keyword arguments for transcribe_audio"""
+    profile = tuned_profile(config, model_size)
+    return {
+        "language": "en",
+        "beam_size": profile["beam_size"],
+        "batch_size": profile["batch_size"],
+        "vad_filter": config.get("vad_filter", True)
+    }
+
+def chunk_worker_threads(model_size):
+    """CPU threads for each chunk worker, splitting the cores between them"""
+    cpu_threads = tuned_profile(config, model_size)["cpu_threads"]
+    return cpu_threads or max(1, (os.cpu_count() or 1) // chunk_pool.workers)
+
+def use_chunking(audio):
+    """Long channels are split into chunks and transcribed on the process pool"""
+    return chunk_pool is not None and len(audio) >= float(config.get("chunk_min_minutes", 20)) * 60 * WHISPER_SAMPLE_RATE
+
+def transcribe_channel(model, audio, channel, progress, options, cancel_event=None, chunk_settings=None,
+                       resume_from=0.0, masked=None):
+    """
+    Lazily transcribe one channel, yielding entries as faster-whisper decodes them
+    options are the transcribe_options of the model
+    Silent stretches are cut out by an energy gate first and the remaining
+    speech is transcribed in one call, with timestamps mapped back onto the
+    original timeline
+    With chunk_settings (the model settings for the pool workers) the speech
+    is instead split into chunks that are transcribed in parallel processes
+    Audio before resume_from (seconds), already transcribed by an earlier
+    run, is skipped, and so are the masked (start, end) sample spans
+    progress[channel] tracks the decoded position and the time spent decoding
+    Decoding stops early once cancel_event is set
+    """
+    state = progress[channel]
+    started = time.perf_counter()
+    timeline = None
+    regions = [(0, len(audio))]
+    if config.get("energy_gate", True):
+        regions = detect_speech_regions(audio, margin_db=float(config.get("energy_gate_margin_db", 10)))
+    state["speech_seconds"] = sum(end - start for start, end in regions) / WHISPER_SAMPLE_RATE
+    if masked:
+        regions = subtract_regions(regions, masked, min_samples=int(0.25 * WHISPER_SAMPLE_RATE))
+        state["masked_seconds"] = state["speech_seconds"] - sum(end - start for start, end in regions) / WHISPER_SAMPLE_RATE
+    if resume_from:
+        resume_sample = int(resume_from * WHISPER_SAMPLE_RATE)
+        regions = [(max(start, resume_sample), end) for start, end in regions if end > resume_sample]
+    state["duration"] = sum(end - start for start, end in regions) / WHISPER_SAMPLE_RATE
+    if not chunk_settings and regions != [(0, len(audio))]:
+        audio, timeline = compact_speech(audio, regions)
+    
+    if not regions or state["duration"] == 0:
+        state["seconds"] += time.perf_counter() - started
+        return
+    
+    if chunk_settings:
+        chunks = chunk_pool.transcribe(
+            audio, regions, chunk_settings, options, state,
+            chunk_seconds=float(config.get("chunk_seconds", 300)),
+            overlap_seconds=float(config.get("chunk_overlap_seconds", 5)),
+            cancel_event=cancel_event
+        )
+        for start, end, text in chunks:
+            yield {"start": start, "end": end, "channel": channel, "text": text}
+        state["position"] = state["duration"]
+        return
+    
+    segments, info = transcribe_audio(model, audio, **options)
+    state["seconds"] += time.perf_counter() - started
+    
+    while cancel_event is None or not cancel_event.is_set():
+        started = time.perf_counter()
+        seg = next(segments, None)
+        state["seconds"] += time.perf_counter() - started
+        if seg is None:
+            break
+        state["position"] = seg.end
+        start, end = seg.start, seg.end
+        if timeline:
+            start = timeline.to_original(start)
+            end = timeline.to_original(end, is_end=True)
+        yield {
+            "start": start,
+            "end": end,
+            "channel": channel,
+            "text": seg.text.strip()
+        }
+    state["position"] = state["duration"]
+
+def checkpointed(stream, checkpoint):
+    """Replay a channel's committed segments, then commit new ones as they arrive"""
+    if checkpoint is None:
+        yield from stream
+        return
+    yield from list(checkpoint.entries)
+    for entry in stream:
+        checkpoint.append(entry)
+        yield entry
+
+def release_checkpoints(checkpoints, key, discard=False):
+    """Close a job's checkpoint files, deleting them once the job has finished"""
+    if not checkpoints:
+        return
+    for checkpoint in checkpoints.values():
+        checkpoint.close()
+    if discard:
+        checkpoint_store.discard(key)
+    checkpoint_store.release(key)
+
+def stream_in_thread(pool, iterable, stop):
+    """
+    Consume an iterable on a worker thread and yield its items as they arrive
+    The worker gives up after the next item once stop is set, so a consumer
+    that failed does not leave it decoding in the background
+    """
+    items = queue.Queue()
+    finished = object()
+    
+    def worker():
+        try:
+            for item in iterable:
+                if stop.is_set():
+                    break
+                items.put(item)
+        finally:
+            items.put(finished)
+    
+    future = pool.submit(worker)
+    while True:
+        item = items.get()
+        if item is finished:
+            future.result()  # Re-raise anything the worker failed with
+            return
+        yield item
+
+def record_metrics(model_size, stages, progress):
+    """Add a finished transcription to the /metrics counters"""
+    for stage, record in stages.items():
+        metrics.observe("transcribe_stage_seconds", record["wall_seconds"], model=model_size, stage=stage)
+        metrics.observe("transcribe_stage_cpu_seconds", record["cpu_seconds"], model=model_size, stage=stage)
+        metrics.set("transcribe_stage_peak_rss_bytes", record["peak_rss_mb"] * 1024 ** 2, model=model_size, stage=stage)
+    for channel, state in progress.items():
+        metrics.inc("transcribe_audio_seconds_total", state["audio_seconds"], model=model_size)
+        if state["audio_seconds"]:
+            metrics.observe("transcribe_real_time_factor", state["seconds"] / state["audio_seconds"],
+                            model=model_size, channel=channel)
+
+def live_metrics():
+    """Gauges read at scrape time"""
+    samples = [("process_resident_memory_bytes", current_rss_bytes(), {})]
+    if job_scheduler:
+        statuses = [
+            job.status for scheduler in (job_scheduler, live_scheduler) if scheduler
+            for job in list(scheduler.jobs.values())
+        ]
+        for status in ("queued", "running", "done", "failed", "cancelled"):
+            samples.append(("transcribe_jobs", statuses.count(status), {"status": status}))
+    return samples
+
+def transcription_progress(progress, started):
+    """Return (fraction done, seconds remaining or None) across all channels"""
+    fractions = [
+        min(1.0, state["position"] / state["duration"]) if state["duration"] else 1.0
+        for state in progress.values()
+    ]
+    done = sum(fractions) / len(fractions)
+    elapsed = time.perf_counter() - started
+    eta = elapsed * (1 - done) / done if done > 0 else None
+    return done, eta
+
+def format_duration(seconds):
+    """Format a number of seconds as e.g. 1h 02m, 3m 20s or 45s"""
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+def transcription_settings(model_size):
+    """Every setting that changes the segments produced, used in the cache key"""
+    profile = tuned_profile(config, model_size)
+    return {
+        "model": model_size,
+        "compute_type": profile["compute_type"],
+        "language": "en",
+        "beam_size": profile["beam_size"],
+        "batch_size": profile["batch_size"],
+        "energy_gate": config.get("energy_gate", True),
+        "energy_gate_margin_db": config.get("energy_gate_margin_db", 10),
+        "vad_filter": config.get("vad_filter", True),
+        "bleed": [
+            config.get("bleed_filter", True),
+            config.get("bleed_mask", False),
+            config.get("bleed_margin_db", 6)
+        ],
+        "chunking": [
+            chunk_pool.workers if chunk_pool else 0,
+            config.get("chunk_min_minutes", 20),
+            config.get("chunk_seconds", 300),
+            config.get("chunk_overlap_seconds", 5)
+        ]
+    }
+
+def default_speaker_name(index, channel):
+    letter = chr(ord("A") + index) if index < 26 else str(index + 1)
+    label = {"left": "Left", "right": "Right"}.get(channel, f"Track {index + 1}")
+    return f"Speaker {letter} ({label})"
+
+def track_speakers(speaker_names, channels):
+    """Name each channel from speaker_names by position; blanks get a default name"""
+    speakers = {}
+    for index, channel in enumerate(channels):
+        name = speaker_names[index] if index < len(speaker_names) else None
+        speakers[channel] = (name or "").strip() or default_speaker_name(index, channel)
+    return speakers
+
+def channel_speakers(speakers, channel_analysis):
+    """Channels that get transcribed, with their names; mono files only keep the left channel"""
+    if channel_analysis and channel_analysis["mono"]:
+        return {"left": f"{speakers['left']} (Mono)"}
+    return speakers
+
+def configured_speaker_names():
+    """Speaker names from the config, by track: default_track_speakers, with
+    default_left_speaker/default_right_speaker for the first two"""
+    names = list(config.get("default_track_speakers") or [])
+    names += [""] * (2 - len(names))
+    names[0] = names[0] or config.get("default_left_speaker", "")
+    names[1] = names[1] or config.get("default_right_speaker", "")
+    return names
+
+def speaker_entry(entry, speakers):
+    """Turn a raw channel segment into an output entry with its speaker name"""
+    return {
+        "start": entry["start"],
+        "end": entry["end"],
+        "speaker": speakers[entry["channel"]],
+        "text": entry["text"]
+    }
+
+def transcript_metadata(source_path, model_size, audio_track_count, speakers, channel_analysis):
+    return {
+        "source_file": source_path.name,
+        "model": model_size,
+        "audio_tracks_detected": audio_track_count,
+        "speakers": {f"{channel}_channel": name for channel, name in speakers.items()},
+        "channel_analysis": channel_analysis
+    }
+
+def prune_job_outputs(outputs_dir):
+    """Delete per-job output folders older than the retention period"""
+    cutoff = time.time() - OUTPUT_RETENTION_SECONDS
+    for path in outputs_dir.glob("*"):
+        try:
+            if path.is_dir() and path.stat().st_mtime < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass
+
+def job_outputs_dir():
+    """
+    Cross-platform temp folder for transcripts made for download; each job
+    writes to its own subfolder so concurrent jobs never overwrite each other
+    """
+    outputs_dir = Path(tempfile.gettempdir()) / "transcribe" / "outputs"
+    outputs_dir.mkdir(parents=True, exist_ok=True)
+    prune_job_outputs(outputs_dir)
+    return outputs_dir
+
+def partial_path(output_file):
+    """
+    Where a transcript is written until it is complete; it only gets its real
+    name once finished, so a failed or cancelled job never leaves a truncated
+    transcript that looks up to date
+    """
+    return output_file.with_name(f"partial_{output_file.name}")
+
+def index_transcript(source_path, output_file, model_size, entries):
+    """Make a finished transcript searchable, replacing the recording's earlier one"""
+    if transcript_index:
+        transcript_index.add(source_path, output_file, entries, model=model_size, source_file=source_path.name)
+
+def success_message(total_segments, speakers, audio_track_count, details):
+    track_info = f" (merged from {audio_track_count} tracks)" if audio_track_count >= 2 else ""
+    return f"""✅ TRANSCRIPTION COMPLETE!
+
+📊 Total segments: {total_segments}
+🎤 Speakers: {" | ".join(speakers.values())}{track_info}
+{details}
+
+⚠️ IMPORTANT: Click the "⬇️ Download Transcript" button below to save your file!
+The transcript will be saved to your browser's default download location."""
+
+def transcribe_file(source_path, speaker_names, output_file, model_size="tiny.en",
+                    output_format="md", parallel_channels=False,
+                    scratch_dir=None, cancel_event=None):
+    """
+    Transcribe one recording into output_file, every channel or track as
+    its own speaker named from speaker_names (by position)
+    Yields progress events as dicts with a "status" message and optionally a
+    "preview", the fraction transcribed so far as "progress" and the
+    "segments" written since the previous event; the final event also
+    carries "output_file" and a "result" summary. Errors are raised to the caller, and setting cancel_event makes
+    the transcription stop with InterruptedError.
+    """
+    source_path = Path(source_path)
+    output_file = Path(output_file)
+    timer = StageTimer()
+    
+    # A source already transcribed with the same settings only needs re-rendering
+    key = None
+    if transcript_cache or checkpoint_store:
+        timer.start("cache_lookup")
+        key = cache_key(source_path, **transcription_settings(model_size))
+    if transcript_cache:
+        yield {"status": "🔍 Checking transcript cache..."}
+        cached = transcript_cache.get(key)
+        if cached:
+            started = time.perf_counter()
+            all_speakers = track_speakers(speaker_names, cached.get("channels", ["left", "right"]))
+            speakers = channel_speakers(all_speakers, cached["channel_analysis"])
+            partial = partial_path(output_file)
+            writer = open_transcript_writer(output_format, partial, transcript_metadata(
+                source_path, model_size, cached["audio_tracks_detected"],
+                all_speakers, cached["channel_analysis"]
+            ))
+            entries = [speaker_entry(entry, speakers) for entry in cached["segments"]]
+            try:
+                for t in entries:
+                    writer.write(t)
+            except BaseException:
+                writer.close()
+                partial.unlink(missing_ok=True)
+                raise
+            writer.close({
+                name: cached[name] for name in ("speech_detection", "bleed") if cached.get(name)
+            })
+            os.replace(partial, output_file)
+            index_transcript(source_path, output_file, model_size, entries)
+            render_ms = (time.perf_counter() - started) * 1000
+            timer.stop()
+            
+            yield {
+                "status": success_message(
+                    writer.count, all_speakers, cached["audio_tracks_detected"],
+                    f"⚡ Re-rendered from cache in {render_ms:.0f} ms (no transcription needed)"
+                ),
+                "preview": render_preview(entries[:10], writer.count),
+                "segments": entries,
+                "output_file": str(output_file),
+                "result": {
+                    "segments": writer.count,
+                    "audio_seconds": cached.get("audio_seconds", 0.0),
+                    "cached": True
+                }
+            }
+            return
+    
+    # Check if file has multiple audio tracks
+    yield {"status": "🔍 Analyzing audio tracks..."}
+    timer.start("probe")
+    media = media_probe.probe(source_path)
+    audio_track_count = media.audio_track_count
+    if not audio_track_count:
+        raise RuntimeError("No audio streams found in the file")
+    length = f" ({format_duration(media.duration)})" if media.duration else ""
+    
+    # Decode every speaker to 16 kHz mono in a single ffmpeg pass
+    if audio_track_count > 2:
+        yield {"status": f"🎙️ Detected {audio_track_count} audio tracks{length} - extracting each track as its own speaker..."}
+    elif audio_track_count == 2:
+        yield {"status": f"🎙️ Detected {audio_track_count} audio tracks{length} - extracting Track 1→Left, Track 2→Right..."}
+    elif media.audio_streams[0].channels == 1:
+        yield {"status": f"🎙️ Detected single mono track{length} - extracting audio..."}
+    else:
+        yield {"status": f"🎙️ Detected single stereo track{length} - extracting left and right audio channels..."}
+    # Decoded PCM goes straight into memory; only very long recordings
+    # spill to a memory-mapped scratch file in the job workspace
+    timer.start("decode")
+    channels = channel_names(media)
+    decoded = load_channels(
+        source_path,
+        media,
+        scratch_dir=scratch_dir,
+        mmap_threshold_seconds=float(config.get("audio_in_memory_max_minutes", 90)) * 60,
+        cancel_event=cancel_event
+    )
+    
+    channel_audio = dict(zip(channels, decoded))
+    
+    # Catch mono audio saved as stereo before spending any model time on it
+    timer.start("channel_analysis")
+    channel_analysis = None
+    if len(channel_audio) == 2:
+        channel_analysis = compare_channels(channel_audio["left"], channel_audio["right"])
+        if channel_analysis["mono"]:
+            yield {"status": f"⚠️ Detected identical audio on both channels (mono file, correlation {channel_analysis['correlation']:.3f}) - transcribing once..."}
+            del channel_audio["right"]
+    all_speakers = track_speakers(speaker_names, channels)
+    speakers = channel_speakers(all_speakers, channel_analysis)
+    
+    # Stretches where a channel only picks up another one through the mic
+    # are cut out with the silence, so that speech is transcribed once
+    bleed_margin_db = float(config.get("bleed_margin_db", 6))
+    masked = {}
+    if config.get("bleed_mask", False) and len(channel_audio) > 1:
+        yield {"status": "🔁 Looking for meeting audio picked up by the other microphones..."}
+        timer.start("bleed_mask")
+        masked = {
+            channel: bleed_regions(
+                audio, [other for name, other in channel_audio.items() if name != channel], bleed_margin_db
+            )
+            for channel, audio in channel_audio.items()
+        }
+    
+    parallel_channels = parallel_channels and len(channel_audio) > 1
+    compute_type, cpu_threads, num_workers = model_worker_settings(model_size)
+    
+    options = transcribe_options(model_size)
+    
+    # Long channels go to the chunk workers, each with its own model copy
+    chunk_settings = {
+        channel: (model_size, compute_type, chunk_worker_threads(model_size), 1) if use_chunking(audio) else None
+        for channel, audio in channel_audio.items()
+    }
+    model = None
+    if all(chunk_settings.values()):
+        yield {"status": f"🧩 Long recording - splitting into chunks for {chunk_pool.workers} worker processes..."}
+    else:
+        if model_registry.is_loaded(model_size, compute_type):
+            yield {"status": f"🤖 Using already loaded {model_size} model..."}
+        else:
+            yield {"status": f"🤖 Loading faster-whisper model (first run may take 2-3 minutes to download)..."}
+        
+        # Shared faster-whisper model (CPU-optimized), loaded once per process
+        timer.start("model_load")
+        model = model_registry.get(model_size, compute_type, cpu_threads, num_workers)
+    
+    progress = {
+        channel: {
+            "audio_seconds": len(audio) / WHISPER_SAMPLE_RATE,
+            "duration": len(audio) / WHISPER_SAMPLE_RATE,
+            "speech_seconds": len(audio) / WHISPER_SAMPLE_RATE,
+            "masked_seconds": 0.0,
+            "position": 0.0,
+            "seconds": 0.0
+        }
+        for channel, audio in channel_audio.items()
+    }
+    transcribing = " and ".join(speakers[channel] for channel in channel_audio)
+    
+    pool = None
+    # Set once the transcription has ended, however it ended, so the
+    # channel workers stop too
+    stop = threading.Event()
+    if parallel_channels:
+        # All channels decode at once, each model worker on its share of the cores
+        yield {"status": f"🎤 Transcribing {transcribing} in parallel ({cpu_threads} threads each)..."}
+        pool = ThreadPoolExecutor(max_workers=len(channel_audio))
+    else:
+        yield {"status": f"🎤 Transcribing {transcribing}..."}
+    
+    # Pick up where an interrupted run of the same job left off; the key
+    # is released again if anything fails before the transcription starts
+    checkpoints = {}
+    try:
+        if checkpoint_store and checkpoint_store.acquire(key):
+            checkpoints = {channel: checkpoint_store.channel(key, channel) for channel in channel_audio}
+        resumed = [
+            f"{speakers[channel]} at {format_duration(checkpoint.last_end)}"
+            for channel, checkpoint in checkpoints.items() if checkpoint.entries
+        ]
+        streams = [
+            checkpointed(
+                transcribe_channel(
+                    model, audio, channel, progress, options, cancel_event, chunk_settings[channel],
+                    resume_from=checkpoints[channel].last_end if checkpoints else 0.0,
+                    masked=masked.get(channel)
+                ),
+                checkpoints.get(channel)
+            )
+            for channel, audio in channel_audio.items()
+        ]
+        if pool:
+            streams = [stream_in_thread(pool, stream, stop) for stream in streams]
+    
+        partial = partial_path(output_file)
+        writer = open_transcript_writer(output_format, partial, transcript_metadata(
+            source_path, model_size, audio_track_count, all_speakers, channel_analysis
+        ))
+        raw_segments = []
+        first_entries = []
+        recent_entries = deque(maxlen=10)
+        unsent_entries = []
+    
+        # The lazy, already sorted segment streams of all channels are
+        # k-way merged on a heap, so each entry is written out as soon as
+        # no earlier one can still arrive
+        merged = heapq.merge(*streams, key=lambda e: e["start"])
+    
+        # Segments repeating louder overlapping ones of another channel are echoes
+        echoes = {}
+        if config.get("bleed_filter", True) and len(channel_audio) > 1:
+            merged = suppress_bleed(
+                merged,
+                lambda e: level_db(channel_audio[e["channel"]], e["start"], e["end"]),
+                echoes,
+                margin_db=bleed_margin_db,
+                follows=lambda e, other: follows_envelope(
+                    channel_audio[e["channel"]], channel_audio[other["channel"]], e["start"], e["end"]
+                )
+            )
+    except BaseException:
+        release_checkpoints(checkpoints, key)
+        if pool:
+            pool.shutdown(wait=False)
+        raise
+    
+    # Pulling the next entry decodes audio, and is timed as "transcribe";
+    # writing it out is timed as "write", so it never counts as model time
+    timer.start("transcribe")
+    started = time.perf_counter()
+    last_update = started
+    try:
+        if resumed:
+            yield {"status": f"♻️ Resuming interrupted transcription: {', '.join(resumed)}..."}
+        
+        for entry in merged:
+            timer.start("write")
+            if cancel_event is not None and cancel_event.is_set():
+                raise InterruptedError("Transcription cancelled")
+            raw_segments.append(entry)
+            t = speaker_entry(entry, speakers)
+            writer.write(t)
+            recent_entries.append(t)
+            unsent_entries.append(t)
+            if len(first_entries) < 10:
+                first_entries.append(t)
+            timer.start("transcribe")
+            
+            now = time.perf_counter()
+            if now - last_update >= 1.0:
+                last_update = now
+                done, eta = transcription_progress(progress, started)
+                eta_info = f", about {format_duration(eta)} left" if eta is not None else ""
+                yield {
+                    "status": f"🎤 Transcribing {transcribing}... {done:.0%}{eta_info} ({writer.count} segments so far)",
+                    "preview": render_preview(list(recent_entries), writer.count, latest=True),
+                    "progress": done,
+                    "segments": unsent_entries
+                }
+                unsent_entries = []
+        # A cancelled channel ends its stream early rather than failing
+        if cancel_event is not None and cancel_event.is_set():
+            raise InterruptedError("Transcription cancelled")
+    except BaseException:
+        timer.stop()
+        writer.close()
+        partial.unlink(missing_ok=True)
+        # Checkpoints are kept, so running the job again resumes it
+        release_checkpoints(checkpoints, key)
+        raise
+    finally:
+        stop.set()
+        if pool:
+            pool.shutdown(wait=False)
+    wall_seconds = time.perf_counter() - started
+    timer.stop()
+    
+    timing_info = "⏱️ Transcription: " + " | ".join(
+        f"{speakers[channel]} {state['seconds']:.1f}s" for channel, state in progress.items()
+    ) + f" | {wall_seconds:.1f}s total"
+    if parallel_channels and wall_seconds > 0:
+        channel_seconds = sum(state["seconds"] for state in progress.values())
+        timing_info += f" ({channel_seconds / wall_seconds:.2f}x vs back-to-back)"
+    
+    # How much audio the energy gate kept away from the model
+    speech_detection = {}
+    skip_info = ""
+    if config.get("energy_gate", True):
+        skipped = []
+        for channel, state in progress.items():
+            skipped_seconds = state["audio_seconds"] - state["speech_seconds"]
+            skipped_percent = 100 * skipped_seconds / state["audio_seconds"] if state["audio_seconds"] else 0.0
+            speech_detection[f"{channel}_channel"] = {
+                "audio_seconds": round(state["audio_seconds"], 2),
+                "speech_seconds": round(state["speech_seconds"], 2),
+                "skipped_percent": round(skipped_percent, 1)
+            }
+            skipped.append(f"{speakers[channel]} {format_duration(skipped_seconds)} ({skipped_percent:.0f}%)")
+        skip_info = "\n🔇 Silence skipped: " + " | ".join(skipped)
+    extra_metadata = {"speech_detection": speech_detection} if speech_detection else {}
+    
+    # What was recognised as bleed from the other channels
+    bleed = {}
+    bleed_info = ""
+    if echoes or any(masked.values()):
+        bleed = {
+            f"{channel}_channel": {
+                "segments_dropped": echoes.get(channel, 0),
+                "masked_seconds": round(progress[channel]["masked_seconds"], 2)
+            }
+            for channel in channel_audio
+        }
+        bleed_info = "\n🔁 Bleed removed: " + " | ".join(
+            f"{speakers[channel]} {echoes.get(channel, 0)} echoed segments"
+            + (f", {format_duration(progress[channel]['masked_seconds'])} masked" if masked else "")
+            for channel in channel_audio
+        )
+        extra_metadata["bleed"] = bleed
+    
+    # Where the time and memory went, and how fast each channel ran
+    performance = timer.summary()
+    performance["channels"] = {
+        f"{channel}_channel": {
+            "audio_seconds": round(state["audio_seconds"], 2),
+            "processing_seconds": round(state["seconds"], 3),
+            "real_time_factor": round(state["seconds"] / state["audio_seconds"], 4) if state["audio_seconds"] else 0.0
+        }
+        for channel, state in progress.items()
+    }
+    extra_metadata["performance"] = performance
+    record_metrics(model_size, timer.stages, progress)
+    perf_info = f"\n📈 Stages: {timer.format()}\n⚡ Real-time factor: " + " | ".join(
+        f"{speakers[channel]} {state['seconds'] / state['audio_seconds'] if state['audio_seconds'] else 0.0:.3f}"
+        for channel, state in progress.items()
+    )
+    
+    writer.close(extra_metadata)
+    os.replace(partial, output_file)
+    total_segments = writer.count
+    index_transcript(source_path, output_file, model_size, [speaker_entry(entry, speakers) for entry in raw_segments])
+    
+    audio_seconds = len(decoded[0]) / WHISPER_SAMPLE_RATE
+    if transcript_cache:
+        transcript_cache.put(key, {
+            "source_file": source_path.name,
+            "audio_seconds": audio_seconds,
+            "audio_tracks_detected": audio_track_count,
+            "channels": channels,
+            "channel_analysis": channel_analysis,
+            "speech_detection": speech_detection,
+            "bleed": bleed,
+            "segments": raw_segments
+        })
+    release_checkpoints(checkpoints, key, discard=True)
+    
+    # Create preview (first 10 entries)
+    preview = render_preview(first_entries, total_segments)
+    
+    yield {
+        "status": success_message(total_segments, all_speakers, audio_track_count, f"{timing_info}{skip_info}{bleed_info}{perf_info}"),
+        "preview": preview,
+        "segments": unsent_entries,
+        "output_file": str(output_file),
+        "result": {
+            "segments": total_segments,
+            "audio_seconds": audio_seconds,
+            "cached": False,
+            "performance": performance
+        }
+    }
+
+def probe_growing(source_path, timeout):
+    """Probe a recording that may not have its headers written yet"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            media = media_probe.probe(source_path)
+            if media.audio_track_count:
+                return media
+        except (OSError, RuntimeError, ValueError):
+            pass
+        if time.monotonic() >= deadline:
+            raise ValueError("No audio tracks found in recording")
+        time.sleep(1.0)
+
+def follow_recording(source_path, speaker_names, output_file, model_size="tiny.en", output_format="md",
+                     cancel_event=None):
+    """
+    Transcribe a recording while it is still being written: new audio of
+    every track is decoded as the file grows and transcribed in rolling
+    windows, and each segment is appended to the transcript as soon as every
+    channel has been transcribed past it; it is renamed to output_file
+    once the recording has ended. Ends once the file has stopped
+    growing for live_idle_seconds, leaving only the last window to do.
+    Yields progress events like transcribe_file.
+    """
+    source_path = Path(source_path)
+    idle_seconds = float(config.get("live_idle_seconds", 15))
+    media = probe_growing(source_path, idle_seconds)
+    channels = channel_names(media)
+    all_speakers = track_speakers(speaker_names, channels)
+    # A single mono track is the same audio on both sides
+    mono = media.audio_track_count == 1 and media.audio_streams[0].channels == 1
+    speakers = channel_speakers(all_speakers, {"mono": True} if mono else None)
+    
+    compute_type, cpu_threads, num_workers = model_worker_settings(model_size)
+    yield {"status": f"🤖 Loading {model_size} model..."}
+    model = model_registry.get(model_size, compute_type, cpu_threads, num_workers)
+    options = transcribe_options(model_size)
+    
+    live_channels = list(speakers)
+    blocks = decode_growing(source_path, media, idle_seconds, cancel_event)
+    if mono:
+        blocks = (block[:, :1] for block in blocks)
+    windows = rolling_windows(blocks, float(config.get("live_window_seconds", 30)))
+    segments = live_segments(
+        windows, lambda audio: transcribe_audio(model, audio, **options)[0],
+        len(live_channels), config.get("energy_gate", True)
+    )
+    
+    partial = partial_path(output_file)
+    writer = open_transcript_writer(output_format, partial, transcript_metadata(
+        source_path, model_size, media.audio_track_count, all_speakers, None
+    ))
+    entries = []
+    recent_entries = deque(maxlen=10)
+    yield {"status": f"🔴 Following {source_path.name} as it is recorded..."}
+    started = time.perf_counter()
+    finished = False
+    try:
+        for index, start, end, text in segments:
+            channel = live_channels[index]
+            entry = speaker_entry({"start": start, "end": end, "channel": channel, "text": text}, speakers)
+            writer.write(entry)
+            entries.append(entry)
+            recent_entries.append(entry)
+            yield {
+                "status": f"🔴 Following {source_path.name}: transcribed up to {format_duration(end)} ({writer.count} segments so far)",
+                "preview": render_preview(list(recent_entries), writer.count, latest=True),
+                "segments": [entry]
+            }
+        finished = True
+    finally:
+        segments.close()
+        writer.close()
+        if not finished:
+            partial.unlink(missing_ok=True)
+    os.replace(partial, output_file)
+    index_transcript(source_path, output_file, model_size, entries)
+    
+    audio_seconds = media_probe.probe(source_path).duration or 0.0
+    yield {
+        "status": success_message(
+            writer.count, speakers, media.audio_track_count,
+            f"⏱️ Finished {time.perf_counter() - started:.1f}s after following began"
+        ),
+        "preview": render_preview(list(recent_entries), writer.count, latest=True),
+        "output_file": str(output_file),
+        "result": {"segments": writer.count, "audio_seconds": audio_seconds, "cached": False}
+    }
+
+def follow_to_file(source_path, output_file, model_size="tiny.en", output_format="md", log=None):
+    """
+    Live-tail a growing recording as a job on the live scheduler, passing a
+    progress line to log every half minute; returns the result summary
+    """
+    speaker_names = configured_speaker_names()
+    job = live_scheduler.submit(
+        lambda job: follow_recording(
+            source_path, speaker_names, output_file, model_size, output_format, cancel_event=job.cancel_event
+        ),
+        description=f"live: {source_path}"
+    )
+    last_log = 0.0
+    for _, event in job.follow():
+        if log and "result" not in event and time.monotonic() - last_log >= 30:
+            last_log = time.monotonic()
+            log(event["status"])
+    if job.status != "done":
+        raise RuntimeError(job.error or f"Job {job.status}")
+    return job.result
+
+def transcribe_to_file(source_path, output_file, model_size="tiny.en", output_format="md",
+                       parallel_channels=False):
+    """
+    Headless transcription with the configured speaker names, run as a job on
+    the scheduler; returns the result summary
+    """
+    speaker_names = configured_speaker_names()
+    job = job_scheduler.submit(
+        lambda job: transcribe_file(
+            source_path, speaker_names, output_file, model_size, output_format, parallel_channels,
+            scratch_dir=job.workspace, cancel_event=job.cancel_event
+        ),
+        description=str(source_path),
+        audio_seconds=probed_duration(source_path)
+    )
+    job.wait()
+    if job.status != "done":
+        raise RuntimeError(job.error or f"Job {job.status}")
+    return job.result
+
+def start_folder_watcher(folders, model_size, output_format, parallel_channels=False, workers=1):
+    """Transcribe recordings that appear in these folders next to themselves"""
+    return FolderWatcher(
+        folders,
+        lambda source, output: transcribe_to_file(source, output, model_size, output_format, parallel_channels),
+        follow=(
+            (lambda source, output: follow_to_file(source, output, model_size, output_format))
+            if config.get("watch_live_tail", True) else None
+        ),
+        output_format=output_format,
+        recursive=config.get("watch_recursive", False),
+        priority=config.get("watch_priority", "shortest"),
+        settle_seconds=float(config.get("watch_settle_seconds", 30)),
+        poll_seconds=float(config.get("watch_poll_seconds", 10)),
+        state=WatchState(config.get("watch_state_db") or None),
+        probe_duration=probed_duration,
+        workers=workers
+    ).start()
+
+def probed_duration(source_path):
+    """Length of a recording for scheduling, or None if it can't be probed yet"""
+    try:
+        return media_probe.probe(source_path).duration
+    except (OSError, RuntimeError, ValueError):
+        return None
+
+# Load user configuration
+config = load_config()
+
+# Keep loaded models around between jobs and warm up the default one
+model_registry = ModelRegistry(ram_budget_mb=config.get("model_ram_budget_mb", 4096))
+
+# Raw segments of finished transcriptions, so re-exports skip ffmpeg and Whisper
+transcript_cache = None
+if config.get("cache_enabled", True):
+    transcript_cache = TranscriptCache(config.get("cache_dir") or None, config.get("cache_max_mb", 500))
+
+# Every transcript written, searchable from the UI
+transcript_index = None
+if config.get("index_enabled", True):
+    transcript_index = TranscriptIndex(config.get("index_db") or None)
+
+# ffprobe results, shared by the queue and the transcription pipeline
+media_probe = MediaProbe()
+
+# Worker processes for chunked transcription of long recordings; a single
+# worker would gain nothing over the in-process model
+chunk_workers = int(config.get("chunk_workers", 0)) or default_chunk_workers(
+    config.get("default_model", "tiny.en"),
+    tuned_profile(config, config.get("default_model", "tiny.en"))["compute_type"],
+    config.get("model_ram_budget_mb", 4096)
+)
+chunk_pool = ChunkPool(chunk_workers) if chunk_workers > 1 else None
+
+# Prometheus metrics, served at /metrics next to the UI
+metrics = MetricsRegistry()
+metrics.describe("transcribe_stage_seconds", "summary", "Wall time spent in each pipeline stage")
+metrics.describe("transcribe_stage_cpu_seconds", "summary", "CPU time of the process (and ffmpeg) in each pipeline stage")
+metrics.describe("transcribe_stage_peak_rss_bytes", "gauge", "Peak resident memory during each stage of the last transcription")
+metrics.describe("transcribe_real_time_factor", "summary", "Processing seconds per second of audio, per channel")
+metrics.describe("transcribe_audio_seconds_total", "counter", "Seconds of audio transcribed")
+metrics.describe("transcribe_jobs", "gauge", "Jobs known to the scheduler by status")
+metrics.describe("process_resident_memory_bytes", "gauge", "Resident memory of the app process")
+metrics.describe("transcribe_startup_seconds", "gauge", "Wall time of each phase of the last process start")
+metrics.add_collector(live_metrics)
+
+# Segments of unfinished transcriptions, so an interrupted job can resume
+checkpoint_store = None
+if config.get("checkpoint_enabled", True):
+    checkpoint_store = CheckpointStore(config.get("checkpoint_dir") or None)
+
+# Queue that runs transcriptions in isolated workspaces; created by the
+# entry point once the concurrency limit for its mode is known
+job_scheduler = None
+
+# Recordings followed live spend most of their time waiting for the next
+# window, so they get their own limit instead of holding a transcription
+# slot for the whole recording
+live_scheduler = None
+
+def start_job_scheduler(max_concurrent_jobs=None):
+    global job_scheduler, live_scheduler
+    job_scheduler = JobScheduler(max_concurrent_jobs, retention_seconds=OUTPUT_RETENTION_SECONDS)
+    live_scheduler = JobScheduler(
+        max(1, int(config.get("live_max_jobs", 2))), retention_seconds=OUTPUT_RETENTION_SECONDS
+    )
+    return job_scheduler
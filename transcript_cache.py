@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+# Bump whenever a pipeline change alters the segments produced for the same
+# input, so stale cache entries stop matching
+PIPELINE_VERSION = 2
+
+# Sampled blocks used to fingerprint a source file
+FINGERPRINT_BLOCKS = 16
+FINGERPRINT_BLOCK_SIZE = 64 * 1024
+
+
+def default_cache_dir():
+    return Path.home() / ".cache" / "mkv2transcript" / "transcripts"
+
+
+def source_fingerprint(path):
+    """
+    Fast content hash of a media file: its size, mtime and a handful of
+    evenly spaced blocks, so multi-GB recordings are never read in full
+    """
+    stat = os.stat(path)
+    digest = hashlib.sha256(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+    with open(path, "rb") as f:
+        if stat.st_size <= FINGERPRINT_BLOCK_SIZE * FINGERPRINT_BLOCKS:
+            digest.update(f.read())
+        else:
+            last_offset = stat.st_size - FINGERPRINT_BLOCK_SIZE
+            for i in range(FINGERPRINT_BLOCKS):
+                f.seek(last_offset * i // (FINGERPRINT_BLOCKS - 1))
+                digest.update(f.read(FINGERPRINT_BLOCK_SIZE))
+    return digest.hexdigest()
+
+
+def cache_key(source_path, **settings):
+    """Key for the raw segments of a source transcribed with the given settings"""
+    payload = {
+        "source": source_fingerprint(source_path),
+        "pipeline_version": PIPELINE_VERSION,
+        **settings,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class TranscriptCache:
+    """
+    On-disk cache of raw transcription results (segments with their channel,
+    before speaker names or an output format are applied), one JSON file per
+    key. Reading an entry refreshes its mtime, and the least recently used
+    entries are deleted once the directory grows past max_mb.
+    """
+
+    def __init__(self, directory=None, max_mb=500):
+        self.directory = Path(directory) if directory else default_cache_dir()
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return self.directory / f"{key}.json"
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def put(self, key, data):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file first so a crash never leaves a torn entry
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, self._path(key))
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits max_mb"""
+        with self._lock:
+            entries = []
+            for path in self.directory.glob("*.json"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
@@ -0,0 +1,163 @@
+"""
+Full-text index of every transcript the app writes, so "who said X in which
+meeting" is one query instead of grepping hundreds of files.
+
+Segments go into an SQLite FTS5 table together with their speaker and
+timestamps. Each recording holds one entry, replaced whenever it is
+transcribed again, so the index stays current without ever being rebuilt.
+"""
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+# Results returned by a search unless asked for more
+SEARCH_LIMIT = 50
+
+# Ranking by relevance scores every match, so queries matching more
+# segments than this (words said in most meetings) list the newest first
+RANKED_MATCHES = 10000
+
+# Segments shown either side of a hit when jumping to it
+CONTEXT_SEGMENTS = 5
+
+
+def default_index_path():
+    return Path.home() / ".cache" / "mkv2transcript" / "index.db"
+
+
+def match_query(text):
+    """
+    Turn what was typed into an FTS5 query: every word must appear, a
+    trailing * matches word prefixes and "quoted phrases" match in order.
+    Anything FTS5 would read as syntax is quoted away
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', text):
+        if phrase.strip():
+            terms.append('"' + phrase.strip().replace('"', '""') + '"')
+        elif word:
+            prefix = word.endswith("*")
+            word = word.rstrip("*").replace('"', '""')
+            if word:
+                terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+class TranscriptIndex:
+    """
+    SQLite FTS5 index of transcript segments, one entry per recording
+    (keyed by its path) pointing at the transcript file last written for it
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else default_index_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS transcripts ("
+                " id INTEGER PRIMARY KEY, source TEXT UNIQUE, source_file TEXT, transcript TEXT,"
+                " model TEXT, segment_count INTEGER, indexed REAL)"
+            )
+            self._db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS segments USING fts5("
+                " text, speaker, transcript_id UNINDEXED, start UNINDEXED, end UNINDEXED,"
+                " tokenize = 'porter unicode61')"
+            )
+
+    def add(self, source, transcript, entries, model=None, source_file=None):
+        """
+        Index the {start, end, speaker, text} entries of a recording's
+        transcript, replacing whatever was indexed for it before
+        """
+        source = str(source)
+        entries = list(entries)
+        with self._lock, self._db:
+            row = self._db.execute("SELECT id FROM transcripts WHERE source = ?", (source,)).fetchone()
+            if row:
+                self._db.execute("DELETE FROM segments WHERE transcript_id = ?", (row[0],))
+            self._db.execute(
+                "INSERT INTO transcripts (source, source_file, transcript, model, segment_count, indexed)"
+                " VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(source) DO UPDATE SET source_file = excluded.source_file,"
+                " transcript = excluded.transcript, model = excluded.model,"
+                " segment_count = excluded.segment_count, indexed = excluded.indexed",
+                (source, source_file or Path(source).name, str(transcript), model, len(entries), time.time())
+            )
+            transcript_id = self._db.execute("SELECT id FROM transcripts WHERE source = ?", (source,)).fetchone()[0]
+            self._db.executemany(
+                "INSERT INTO segments (text, speaker, transcript_id, start, end) VALUES (?, ?, ?, ?, ?)",
+                [(e["text"], e["speaker"], transcript_id, e["start"], e["end"]) for e in entries]
+            )
+
+    def remove(self, source):
+        with self._lock, self._db:
+            row = self._db.execute("SELECT id FROM transcripts WHERE source = ?", (str(source),)).fetchone()
+            if row:
+                self._db.execute("DELETE FROM segments WHERE transcript_id = ?", (row[0],))
+                self._db.execute("DELETE FROM transcripts WHERE id = ?", (row[0],))
+
+    def search(self, text, speaker=None, limit=SEARCH_LIMIT):
+        """
+        Best matching segments first (newest first for very common words),
+        as dicts with the recording, transcript file, speaker, start, end,
+        text and a snippet with the hits in **bold**
+        """
+        query = match_query(text)
+        if not query:
+            return []
+        # A speaker filter without any words (just "*", say) filters nothing
+        speaker_query = match_query(speaker or "")
+        if speaker_query:
+            query = f"{{text}} : ({query}) AND speaker : ({speaker_query})"
+        else:
+            query = f"text : ({query})"
+        with self._lock:
+            matches = self._db.execute(
+                "SELECT COUNT(*) FROM (SELECT rowid FROM segments WHERE segments MATCH ? LIMIT ?)",
+                (query, RANKED_MATCHES + 1)
+            ).fetchone()[0]
+            order = "bm25(segments)" if matches <= RANKED_MATCHES else "segments.rowid DESC"
+            rows = self._db.execute(
+                "SELECT segments.rowid, t.source, t.source_file, t.transcript, segments.speaker,"
+                " segments.start, segments.end, segments.text,"
+                " snippet(segments, 0, '**', '**', ' … ', 24)"
+                " FROM segments JOIN transcripts t ON t.id = segments.transcript_id"
+                f" WHERE segments MATCH ? ORDER BY {order} LIMIT ?",
+                (query, limit)
+            ).fetchall()
+        keys = ("id", "source", "source_file", "transcript", "speaker", "start", "end", "text", "snippet")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def context(self, segment_id, around=CONTEXT_SEGMENTS):
+        """
+        A segment with its neighbours in the same transcript, in time order;
+        a transcript's segments are inserted together and in order, so its
+        neighbours are the adjacent rowids
+        """
+        with self._lock:
+            row = self._db.execute("SELECT transcript_id FROM segments WHERE rowid = ?", (segment_id,)).fetchone()
+            if row is None:
+                return []
+            rows = self._db.execute(
+                "SELECT rowid, speaker, start, end, text FROM segments"
+                " WHERE rowid BETWEEN ? AND ? AND transcript_id = ? ORDER BY rowid",
+                (segment_id - around, segment_id + around, row[0])
+            ).fetchall()
+        keys = ("id", "speaker", "start", "end", "text")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def counts(self):
+        with self._lock:
+            transcripts, segments = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(segment_count), 0) FROM transcripts"
+            ).fetchone()
+        return {"transcripts": transcripts, "segments": segments}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
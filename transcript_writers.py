@@ -0,0 +1,146 @@
+import json
+import re
+import textwrap
+from datetime import timedelta
+
+
+def format_timestamp(seconds):
+    """Convert seconds to HH:MM:SS.mmm format"""
+    td = timedelta(seconds=seconds)
+    hours, remainder = divmod(td.total_seconds(), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{seconds:06.3f}"
+
+
+def format_entry(t):
+    """Plain text rendering of one entry, shared by TXT output and the preview"""
+    return f"[{format_timestamp(t['start'])}] {t['speaker']}:\n{t['text']}"
+
+
+def words(text):
+    """Lowercase words of a segment's text, for comparing transcripts"""
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+class TranscriptWriter:
+    """
+    Appends transcript entries to the output file as they are produced.
+
+    Entries are dicts with start, end, speaker and text, arriving in start
+    order. Each write is flushed so the file on disk always holds everything
+    transcribed so far.
+    """
+
+    def __init__(self, path, metadata=None):
+        self.path = path
+        self.metadata = metadata or {}
+        self.count = 0
+        self._file = open(path, "w", encoding="utf-8")
+        self._file.write(self.header())
+
+    def header(self):
+        return ""
+
+    def render(self, entry):
+        raise NotImplementedError
+
+    def footer(self, extra):
+        return ""
+
+    def write(self, entry):
+        self._file.write(self.render(entry))
+        self._file.flush()
+        self.count += 1
+
+    def close(self, extra=None):
+        """Finish the file; extra metadata is only used by formats that carry it"""
+        self._file.write(self.footer(extra or {}))
+        self._file.close()
+
+
+class TxtTranscriptWriter(TranscriptWriter):
+    def render(self, entry):
+        separator = "\n\n" if self.count else ""
+        return separator + format_entry(entry)
+
+
+class MarkdownTranscriptWriter(TranscriptWriter):
+    """Markdown format with timestamps every 5 minutes"""
+
+    def __init__(self, path, metadata=None):
+        self.last_timestamp_minute = -5  # Force first timestamp
+        super().__init__(path, metadata)
+
+    def render(self, entry):
+        parts = []
+        current_minute = int(entry['start'] / 60)
+        # Add timestamp header every 5 minutes
+        if current_minute - self.last_timestamp_minute >= 5:
+            parts.append(f"\n## {format_timestamp(entry['start'])}\n\n")
+            self.last_timestamp_minute = current_minute
+
+        # Format: **Speaker**: Dialog text
+        parts.append(f"**{entry['speaker']}**: {entry['text']}\n\n")
+        return "".join(parts)
+
+
+class SrtTranscriptWriter(TranscriptWriter):
+    def render(self, entry):
+        separator = "\n" if self.count else ""
+        start_time = format_timestamp(entry['start']).replace('.', ',')
+        end_time = format_timestamp(entry['end']).replace('.', ',')
+        return f"{separator}{self.count + 1}\n{start_time} --> {end_time}\n{entry['speaker']}: {entry['text']}\n"
+
+
+class JsonTranscriptWriter(TranscriptWriter):
+    """
+    Streams a JSON document whose "transcript" array grows entry by entry.
+    Metadata passed at construction comes first, extra metadata given to
+    close() is appended after the transcript.
+    """
+
+    def header(self):
+        if not self.metadata:
+            return '{\n  "transcript": ['
+        opening = json.dumps(self.metadata, indent=2, ensure_ascii=False)[:-2]
+        return opening + ',\n  "transcript": ['
+
+    def render(self, entry):
+        separator = "," if self.count else ""
+        body = textwrap.indent(json.dumps(entry, indent=2, ensure_ascii=False), "    ")
+        return f"{separator}\n{body}"
+
+    def footer(self, extra):
+        closing = "\n  ]" if self.count else "]"
+        for key, value in extra.items():
+            rendered = json.dumps(value, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+            closing += f",\n  {json.dumps(key)}: {rendered}"
+        return closing + "\n}"
+
+
+TRANSCRIPT_WRITERS = {
+    "txt": TxtTranscriptWriter,
+    "md": MarkdownTranscriptWriter,
+    "srt": SrtTranscriptWriter,
+    "json": JsonTranscriptWriter,
+}
+
+
+def open_transcript_writer(output_format, path, metadata=None):
+    """Create the incremental writer for an output format (JSON by default)"""
+    writer_class = TRANSCRIPT_WRITERS.get(output_format, JsonTranscriptWriter)
+    return writer_class(path, metadata)
+
+
+def render_preview(entries, total, latest=False):
+    """
+    Render up to 10 entries for the preview box
+    latest=True shows the most recent entries of a transcript still in progress
+    """
+    body = "\n\n".join(format_entry(t) for t in entries)
+    hidden = total - len(entries)
+    if hidden <= 0:
+        return body
+    if latest:
+        return f"... ({hidden} earlier entries) ...\n\n{body}"
+    return f"{body}\n\n... ({hidden} more entries) ..."
@@ -0,0 +1,381 @@
+"""
+The Gradio web UI, mounted on FastAPI together with /metrics and the job
+API from http_api.py. Imported only when the UI is started, since gradio
+alone takes seconds to import.
+"""
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import gradio as gr
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+import pipeline
+from http_api import router as api_router
+from pipeline import MODEL_CHOICES, config, format_duration, job_outputs_dir, metrics, probed_duration, transcribe_file
+from transcript_writers import format_timestamp
+
+def queued_message(job):
+    info = pipeline.job_scheduler.queue_info()
+    position = pipeline.job_scheduler.queue_position(job)
+    ahead = pipeline.job_scheduler.audio_ahead(job)
+    ahead_info = f", {format_duration(ahead)} of audio ahead" if ahead else ""
+    return (
+        f"⏳ Queued – position {position} of {info['queued']} "
+        f"({info['running']}/{info['limit']} jobs running{ahead_info})"
+    )
+
+def process_stereo_audio(video_file, left_speaker_name, right_speaker_name,
+                        output_filename, model_size="tiny.en", output_format="md",
+                        parallel_channels=False, more_speaker_names=""):
+    if not video_file:
+        yield "❌ Error: No file selected", None, None, None, None
+        return
+    
+    job = None
+    try:
+        # Speaker names by track; blanks get a default name once the tracks are known
+        speaker_names = [left_speaker_name, right_speaker_name]
+        speaker_names += [name.strip() for name in (more_speaker_names or "").split(",")]
+        
+        # Get source file info
+        source_path = Path(video_file)
+        
+        # Set output filename
+        if not output_filename or output_filename.strip() == "":
+            output_filename = source_path.stem + "_transcript"
+        else:
+            output_filename = Path(output_filename).stem
+        
+        outputs_dir = job_outputs_dir()
+        
+        # Set output file extension
+        if output_format not in ("txt", "md", "srt"):
+            output_format = "json"
+        
+        def run(job):
+            output_dir = outputs_dir / job.id
+            output_dir.mkdir(exist_ok=True)
+            return transcribe_file(
+                source_path, speaker_names, output_dir / f"{output_filename}.{output_format}",
+                model_size, output_format, parallel_channels,
+                scratch_dir=job.workspace, cancel_event=job.cancel_event
+            )
+        
+        job = pipeline.job_scheduler.submit(run, description=source_path.name,
+                                   audio_seconds=probed_duration(source_path))
+        while not job.wait_until_started(timeout=1):
+            yield queued_message(job), None, None, None, job.id
+        
+        for _, event in job.follow():
+            yield event["status"], event.get("preview"), event.get("output_file"), event.get("output_file"), job.id
+        
+        if job.status == "cancelled":
+            yield "🛑 Transcription cancelled", None, None, None, None
+        elif job.status == "failed":
+            yield f"❌ Error: {job.error}", None, None, None, None
+        
+    except Exception as e:
+        yield f"❌ Error: {str(e)}", None, None, None, None
+    finally:
+        # The page went away mid-run: don't leave the job burning CPU
+        if job is not None and not job.finished:
+            pipeline.job_scheduler.cancel(job.id)
+
+def cancel_transcription(job_id):
+    if job_id and pipeline.job_scheduler.cancel(job_id):
+        return "🛑 Cancelling transcription..."
+    return "Nothing to cancel"
+
+def search_transcripts(query, speaker):
+    """Search the transcript index; returns the summary line, the result rows and the hits"""
+    if not pipeline.transcript_index:
+        return "Transcript search is turned off (`index_enabled` in the config)", [], []
+    if not (query or "").strip():
+        return "", [], []
+    started = time.perf_counter()
+    hits = pipeline.transcript_index.search(query, speaker)
+    search_ms = (time.perf_counter() - started) * 1000
+    counts = pipeline.transcript_index.counts()
+    rows = [[hit["source_file"], format_timestamp(hit["start"]), hit["speaker"], hit["snippet"]] for hit in hits]
+    summary = (
+        f"🔎 {len(hits)} matches in {search_ms:.0f} ms across {counts['transcripts']} transcripts "
+        f"({counts['segments']} segments) - select one to jump to it"
+    )
+    return summary, rows, hits
+
+def show_search_hit(hits, evt: gr.SelectData):
+    """The selected hit with the segments around it, and its transcript file if it still exists"""
+    if not hits or evt.index[0] >= len(hits):
+        return "", None
+    hit = hits[evt.index[0]]
+    lines = [f"### {hit['source_file']} at {format_timestamp(hit['start'])}", f"`{hit['source']}`", ""]
+    for entry in pipeline.transcript_index.context(hit["id"]):
+        line = f"[{format_timestamp(entry['start'])}] **{entry['speaker']}:** {entry['text']}"
+        lines.append(f"> ➡️ {line}" if entry["id"] == hit["id"] else line)
+        lines.append("")
+    return "\n".join(lines), downloadable(Path(hit["transcript"]), f"search-{hit['id']}")
+
+def downloadable(transcript, folder):
+    """
+    A path Gradio will serve for a transcript, or None if it is gone:
+    transcripts written next to recordings (batch, watch folders) are
+    copied into their own folder under the job outputs first, as Gradio
+    only serves files from its temp folders
+    """
+    if not transcript.is_file():
+        return None
+    outputs_dir = job_outputs_dir()
+    if transcript.resolve().is_relative_to(outputs_dir.resolve()):
+        return str(transcript)
+    copy = outputs_dir / folder / transcript.name
+    copy.parent.mkdir(exist_ok=True)
+    shutil.copyfile(transcript, copy)
+    return str(copy)
+
+def build_ui():
+    """Gradio interface with enhanced UX"""
+    with gr.Blocks(title="Stereo Channel Transcription") as demo:
+        gr.Markdown("""
+# 🎙️ Stereo Channel Transcription
+
+**Supports two input types:**
+- **Dual-track MKV** (e.g., OBS recordings): Automatically merges Track 1→Left, Track 2→Right
+- **Multi-track MKV** (3 or more tracks): Every track is transcribed as its own speaker
+- **Single stereo file** (MKV/MP4/WAV): Processes left/right channels directly
+""")
+    
+        with gr.Tab("🎙️ Transcribe"):
+            with gr.Row():
+                with gr.Column():
+                    video_input = gr.File(
+                        label="📂 Select Audio/Video File",
+                        file_types=[".mkv", ".mp4", ".avi", ".mov", ".wav", ".mp3"],
+                        type="filepath"
+                    )
+            
+                    gr.Markdown("### 🎤 Speaker Names")
+                    with gr.Row():
+                        left_speaker = gr.Textbox(
+                            label="👤 Left Channel Speaker",
+                            placeholder="e.g., John Smith, Interviewer, Microphone",
+                            info="Name for the speaker on the left audio channel (or Track 1)",
+                            value=config.get("default_left_speaker", "")
+                        )
+                
+                        right_speaker = gr.Textbox(
+                            label="👤 Right Channel Speaker",
+                            placeholder="e.g., Jane Doe, Guest, Meeting Audio",
+                            info="Name for the speaker on the right audio channel (or Track 2)",
+                            value=config.get("default_right_speaker", "")
+                        )
+            
+                    more_speakers = gr.Textbox(
+                        label="👥 Speakers on Tracks 3 and Up",
+                        placeholder="e.g., Discord, Phone Bridge",
+                        info="Comma-separated names for recordings with more than two audio tracks, in track order",
+                        value=", ".join((config.get("default_track_speakers") or [])[2:])
+                    )
+            
+                    output_name = gr.Textbox(
+                        label="💾 Output Filename (without extension)",
+                        placeholder="Leave blank to use source filename + '_transcript'",
+                        info="File will be available for download after processing"
+                    )
+            
+                    with gr.Row():
+                        model_dropdown = gr.Dropdown(
+                            choices=list(MODEL_CHOICES),
+                            value=config.get("default_model", "tiny.en"),
+                            label="🤖 Model Size",
+                            info="Tiny = 10x faster. Medium = best balance. Large = most accurate but slower."
+                        )
+                
+                        format_dropdown = gr.Dropdown(
+                            choices=["md", "txt", "srt", "json"],
+                            value=config.get("default_format", "md"),
+                            label="📄 Output Format",
+                            info="MD = markdown (default), TXT = timestamped, SRT = subtitles, JSON = data"
+                        )
+            
+                    parallel_checkbox = gr.Checkbox(
+                        label="⚡ Transcribe channels in parallel",
+                        value=config.get("parallel_channels", False),
+                        info="Runs both speakers at once, splitting the CPU threads between them"
+                    )
+            
+                    with gr.Row():
+                        process_btn = gr.Button("🚀 Start Transcription", variant="primary", size="lg")
+                        cancel_btn = gr.Button("🛑 Cancel Transcription", variant="stop", size="lg")
+                
+                    job_id = gr.State(None)
+            
+                    download_button = gr.File(
+                        label="⬇️ Download Transcript (available after processing completes)",
+                        interactive=False,
+                        visible=True
+                    )
+            
+                    clear_btn = gr.Button("🔄 Clear and Start New Transcription", size="lg")
+        
+                with gr.Column():
+                    status_output = gr.Textbox(
+                        label="📊 Status",
+                        lines=8,
+                        interactive=False
+                    )
+            
+                    preview_output = gr.Textbox(
+                        label="👀 Preview (latest segments while running, first 10 when done)",
+                        lines=18,
+                        interactive=False
+                    )
+            
+                    file_output = gr.Textbox(
+                        label="📁 Internal Path",
+                        interactive=False,
+                        visible=False
+                    )
+    
+            gr.Markdown("""
+---
+### 🎙️ How It Works
+
+**Dual-Track Files (OBS recordings):**
+- Automatically detects multiple audio tracks
+- Merges Track 1 (mic) to LEFT channel, Track 2 (meeting/desktop) to RIGHT channel
+- Then transcribes each channel separately
+
+**Multi-Track Files (3 or more tracks):**
+- Each track (mic, Meet, Discord, phone bridge, ...) is transcribed as its own speaker
+- Tracks 1 and 2 use the Left/Right speaker names, further tracks the "Tracks 3 and Up" names
+- All speakers are merged into one transcript in time order
+
+**Single Stereo Files:**
+- Processes LEFT and RIGHT channels directly
+
+### ⚠️ File Download Instructions
+
+After transcription completes:
+1. ✅ Click the **"⬇️ Download Transcript"** button (below Start button)
+2. ✅ File saves to your browser's default download location
+3. ✅ Move it from Downloads to wherever you need it
+
+---
+
+### ⚙️ Performance Notes
+
+- **First run**: Model downloads automatically (~39MB for tiny.en, ~200MB for medium, ~1.5GB for large-v2)
+- **Processing time**: ~1-2 seconds per minute of audio with tiny.en on Intel CPU (4-5x faster than WhisperX!)
+- **Supported formats**: MKV, MP4, AVI, MOV, WAV, MP3
+
+### 💡 Tips
+
+- **Markdown (MD)**: Clean format with timestamps every 5 minutes, bold speaker names
+- Use **tiny.en** model for fastest processing (10x faster than large, good accuracy)
+- Use **medium.en** model for best accuracy/speed balance
+- Use **small.en** model for faster processing (3x speed vs medium, slight quality loss)
+- SRT format works great for video editors
+- JSON format preserves all metadata
+
+### ⚙️ Configuration File (Optional)
+
+- Create a `transcribe_config.json` file in the same folder as this script to set defaults
+- Copy `transcribe_config.example.json` as a starting point
+- Available options: `default_model`, `default_format`, `default_left_speaker`, `default_right_speaker`, `default_track_speakers`, `compute_type`, `cpu_threads`, `tuned_profiles_file`, `beam_size`, `batch_size`, `model_ram_budget_mb`, `preload_model`, `audio_in_memory_max_minutes`, `parallel_channels`, `energy_gate`, `energy_gate_margin_db`, `bleed_filter`, `bleed_mask`, `bleed_margin_db`, `vad_filter`, `cache_enabled`, `cache_dir`, `cache_max_mb`, `index_enabled`, `index_db`, `batch_workers`, `max_concurrent_jobs`, `chunk_workers`, `chunk_min_minutes`, `chunk_seconds`, `chunk_overlap_seconds`, `checkpoint_enabled`, `checkpoint_dir`, `watch_folders`, `watch_recursive`, `watch_priority`, `watch_workers`, `watch_settle_seconds`, `watch_poll_seconds`, `watch_state_db`, `watch_live_tail`, `live_window_seconds`, `live_idle_seconds`, `live_max_jobs`, `api_allowed_dirs`
+- Changes take effect when you restart the application
+- Example config:
+```json
+{
+    "default_model": "tiny.en",
+    "default_format": "md",
+    "default_left_speaker": "Interviewer",
+    "default_right_speaker": "Guest"
+}
+
+""")
+
+        with gr.Tab("🔎 Search Transcripts"):
+            with gr.Row():
+                search_query = gr.Textbox(
+                    label="🔎 Search",
+                    placeholder='e.g., budget, "release date", deploy*',
+                    info="Every word must appear; quote phrases, end a word with * to match its prefix",
+                    scale=3
+                )
+                search_speaker = gr.Textbox(label="👤 Speaker (optional)", placeholder="e.g., Jane", scale=1)
+            search_btn = gr.Button("🔎 Search", variant="primary")
+            search_summary = gr.Markdown()
+            search_results = gr.Dataframe(
+                headers=["Recording", "Time", "Speaker", "Text"],
+                datatype=["str", "str", "str", "markdown"],
+                interactive=False,
+                wrap=True
+            )
+            search_hits = gr.State([])
+            search_context = gr.Markdown()
+            search_transcript = gr.File(label="📄 Transcript", interactive=False)
+
+        # Event handlers
+        process_btn.click(
+        fn=process_stereo_audio,
+        inputs=[video_input, left_speaker, right_speaker, output_name, model_dropdown, format_dropdown, parallel_checkbox, more_speakers],
+        outputs=[status_output, preview_output, file_output, download_button, job_id],
+        concurrency_limit=None
+        )
+
+        cancel_btn.click(
+        fn=cancel_transcription,
+        inputs=[job_id],
+        outputs=[status_output]
+        )
+
+        for trigger in (search_btn.click, search_query.submit, search_speaker.submit):
+            trigger(
+            fn=search_transcripts,
+            inputs=[search_query, search_speaker],
+            outputs=[search_summary, search_results, search_hits]
+            )
+
+        search_results.select(
+        fn=show_search_hit,
+        inputs=[search_hits],
+        outputs=[search_context, search_transcript]
+        )
+
+        # Clear button resets everything
+        clear_btn.click(
+        fn=lambda: (None, "", "", "", "", "tiny.en", "md", config.get("parallel_channels", False), "", "", None, None, None),
+        inputs=[],
+        outputs=[video_input, left_speaker, right_speaker, more_speakers, output_name, model_dropdown, format_dropdown, parallel_checkbox, status_output, preview_output, file_output, download_button, job_id]
+        )
+
+    return demo
+
+def build_server(demo):
+    """The Gradio UI mounted on a FastAPI app that also serves /metrics and the job API under /api"""
+    server = FastAPI()
+    server.include_router(api_router)
+    
+    @server.get("/metrics")
+    def metrics_endpoint():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+    
+    return gr.mount_gradio_app(server, demo, path="/")
+
+def serve(host="0.0.0.0", port=7860, on_ready=None):
+    """Build the UI and serve it until interrupted; on_ready() runs once the server accepts requests"""
+    server = uvicorn.Server(uvicorn.Config(build_server(build_ui()), host=host, port=port))
+    
+    def wait_until_started():
+        while not server.started and not server.should_exit:
+            time.sleep(0.05)
+        if server.started:
+            on_ready()
+    
+    if on_ready:
+        threading.Thread(target=wait_until_started, name="startup-report", daemon=True).start()
+    server.run()
@@ -0,0 +1,388 @@
+import ctypes
+import ctypes.util
+import itertools
+import os
+import queue
+import select
+import sqlite3
+import struct
+import threading
+import time
+from pathlib import Path
+
+from batch import MEDIA_EXTENSIONS, is_up_to_date, transcript_path
+
+# A recording counts as finished once its size and mtime stop changing for this long
+SETTLE_SECONDS = 30
+
+# Full rescans of the watched folders; with inotify they only catch events
+# that never arrive, so they run RESCAN_FACTOR times less often
+POLL_SECONDS = 10
+RESCAN_FACTOR = 6
+
+PRIORITIES = ("shortest", "newest")
+
+# States a recording is left in when the watcher stops before it finished
+UNFINISHED = ("queued", "running", "live")
+
+# Containers that can be decoded while still being written
+FOLLOW_EXTENSIONS = {".mkv"}
+
+# inotify(7) event bits
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+_EVENT = struct.Struct("iIII")
+
+
+def default_state_path():
+    return Path.home() / ".cache" / "mkv2transcript" / "watch.db"
+
+
+class WatchState:
+    """
+    SQLite record of every recording the watcher has seen, keyed by path and
+    remembering the size and mtime it was handled at, so a restart neither
+    transcribes a finished recording again nor forgets a queued one
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else default_state_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS recordings ("
+                " path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, status TEXT,"
+                " transcript TEXT, error TEXT, updated REAL)"
+            )
+
+    def get(self, path):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT size, mtime_ns, status, transcript, error FROM recordings WHERE path = ?", (str(path),)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("size", "mtime_ns", "status", "transcript", "error"), row))
+
+    def set(self, path, size, mtime_ns, status, transcript=None, error=None):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO recordings VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (str(path), size, mtime_ns, status, transcript, error, time.time())
+            )
+
+    def is_handled(self, path, size, mtime_ns):
+        """True when this version of the recording was transcribed or failed"""
+        row = self.get(path)
+        return bool(row) and row["status"] in ("done", "failed") and (row["size"], row["mtime_ns"]) == (size, mtime_ns)
+
+    def counts(self):
+        with self._lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM recordings GROUP BY status").fetchall())
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class Inotify:
+    """
+    Minimal inotify binding through libc; raises OSError where inotify is
+    not available (not Linux, or out of instances)
+    """
+
+    MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+    def __init__(self):
+        name = ctypes.util.find_library("c")
+        self._libc = ctypes.CDLL(name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._directories = {}
+
+    def add(self, directory):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(str(directory)), self.MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"Could not watch {directory}")
+        self._directories[wd] = Path(directory)
+
+    def read(self, timeout):
+        """
+        Wait up to timeout seconds for events; returns (path, is_dir) pairs,
+        or None when the kernel queue overflowed and events were lost
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        changes = []
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0")
+            offset += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            directory = self._directories.get(wd)
+            if directory is not None and name:
+                changes.append((directory / os.fsdecode(name), bool(mask & IN_ISDIR)))
+        return changes
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """
+    Transcribes recordings that appear in watched folders, in place.
+
+    New or changed media files are found through inotify, or by rescanning
+    the folders where inotify is unavailable, and wait until their size and
+    mtime have been stable for settle_seconds, so a recording OBS is still
+    writing is left alone. Finished recordings go to a priority queue,
+    shortest or newest first, served by workers threads that each call
+    transcribe(source, output_file). Outcomes are kept in a WatchState.
+
+    With follow(source, output_file), an MKV seen growing is instead
+    transcribed while it is being recorded, on a thread of its own; if that
+    fails it is transcribed normally once it has settled.
+    """
+
+    def __init__(self, folders, transcribe, output_format="md", recursive=False, priority="shortest",
+                 settle_seconds=SETTLE_SECONDS, poll_seconds=POLL_SECONDS, state=None,
+                 probe_duration=None, workers=1, follow=None, log=print):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown watch priority: {priority}")
+        self.folders = [Path(folder).resolve() for folder in folders]
+        self.transcribe = transcribe
+        self.output_format = output_format
+        self.recursive = recursive
+        self.priority = priority
+        self.settle_seconds = settle_seconds
+        self.poll_seconds = poll_seconds
+        self.state = state or WatchState()
+        self.probe_duration = probe_duration
+        self.workers = max(1, workers)
+        self.follow = follow
+        self.log = log
+        # Versions already decided on, so rescans skip them without a lookup
+        self._seen = {}
+        # Recordings waiting to settle: path -> (size, mtime_ns, stable since)
+        self._settling = {}
+        # Recordings being followed live, and those where that failed
+        self._following = set()
+        self._no_follow = set()
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        self._threads = [threading.Thread(target=self._watch, name="folder-watch", daemon=True)]
+        self._threads += [
+            threading.Thread(target=self._work, name=f"folder-watch-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _directories(self):
+        for folder in self.folders:
+            yield folder
+            if self.recursive:
+                yield from (path for path in folder.rglob("*") if path.is_dir())
+
+    def _open_inotify(self):
+        try:
+            inotify = Inotify()
+        except OSError as e:
+            self.log(f"👀 inotify unavailable ({e}) - polling every {self.poll_seconds:g}s")
+            return None
+        try:
+            for directory in self._directories():
+                inotify.add(directory)
+        except OSError as e:
+            inotify.close()
+            self.log(f"👀 Could not watch folders with inotify ({e}) - polling every {self.poll_seconds:g}s")
+            return None
+        return inotify
+
+    def _watch(self):
+        inotify = self._open_inotify()
+        folders = ", ".join(str(folder) for folder in self.folders)
+        self.log(f"👀 Watching {folders} for finished recordings")
+        rescan_seconds = self.poll_seconds * (RESCAN_FACTOR if inotify else 1)
+        last_scan = None
+        try:
+            while not self._stop.is_set():
+                if last_scan is None or time.monotonic() - last_scan >= rescan_seconds:
+                    self._scan()
+                    last_scan = time.monotonic()
+                if inotify:
+                    changes = inotify.read(timeout=1.0)
+                    if changes is None:
+                        last_scan = None
+                    # A recording being written reports many changes per read
+                    for path, is_dir in dict.fromkeys(changes or ()):
+                        if is_dir and self.recursive:
+                            try:
+                                inotify.add(path)
+                            except OSError:
+                                pass
+                            self._scan(path)
+                        elif not is_dir:
+                            self._consider(path)
+                else:
+                    self._stop.wait(1.0)
+                self._check_settled()
+        except Exception as e:
+            self.log(f"❌ Folder watcher stopped: {e}")
+            raise
+        finally:
+            if inotify:
+                inotify.close()
+
+    def _scan(self, directory=None):
+        folders = [directory] if directory else self.folders
+        for folder in folders:
+            try:
+                candidates = folder.rglob("*") if self.recursive else folder.iterdir()
+                for path in candidates:
+                    self._consider(path)
+            except OSError as e:
+                self.log(f"⚠️ Could not scan {folder}: {e}")
+
+    def _consider(self, path):
+        """Start watching a media file unless this version was already handled"""
+        if path.suffix.lower() not in MEDIA_EXTENSIONS:
+            return
+        try:
+            stat = path.stat()
+        except OSError:
+            return
+        version = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            if self._seen.get(path) == version or path in self._settling or path in self._following:
+                return
+            self._seen[path] = version
+
+        if self.state.is_handled(path, *version):
+            return
+        # A recording left queued, running or live by a restart is transcribed
+        # again rather than trusting whatever output it left behind
+        row = self.state.get(path)
+        unfinished = row is not None and row["status"] in UNFINISHED
+        if not unfinished and is_up_to_date(path, transcript_path(path, self.output_format)):
+            self.state.set(path, *version, "done", str(transcript_path(path, self.output_format)))
+            return
+        with self._lock:
+            self._settling[path] = (*version, time.monotonic())
+
+    def _check_settled(self):
+        now = time.monotonic()
+        with self._lock:
+            settling = list(self._settling.items())
+        for path, (size, mtime_ns, since) in settling:
+            try:
+                stat = path.stat()
+            except OSError:
+                with self._lock:
+                    self._settling.pop(path, None)
+                    self._seen.pop(path, None)
+                continue
+            version = (stat.st_size, stat.st_mtime_ns)
+            with self._lock:
+                if version != (size, mtime_ns):
+                    # Still being written
+                    self._seen[path] = version
+                    if self.follow and path.suffix.lower() in FOLLOW_EXTENSIONS and path not in self._no_follow:
+                        del self._settling[path]
+                        self._following.add(path)
+                        threading.Thread(
+                            target=self._follow, args=(path,), name=f"folder-watch-live-{path.name}", daemon=True
+                        ).start()
+                    else:
+                        self._settling[path] = (*version, now)
+                    continue
+                if now - since < self.settle_seconds:
+                    continue
+                del self._settling[path]
+            self._enqueue(path, *version)
+
+    def _enqueue(self, path, size, mtime_ns):
+        if self.priority == "newest":
+            rank = -mtime_ns
+        else:
+            duration = self.probe_duration(path) if self.probe_duration else None
+            rank = duration if duration is not None else float("inf")
+        self.state.set(path, size, mtime_ns, "queued")
+        self._queue.put((rank, next(self._order), path, size, mtime_ns))
+        self.log(f"📥 Queued {path.name}")
+
+    def _follow(self, path):
+        output = transcript_path(path, self.output_format)
+        self.state.set(path, None, None, "live")
+        self.log(f"🔴 Transcribing {path.name} live while it is recorded")
+        try:
+            self.follow(path, output)
+            stat = path.stat()
+        except Exception as e:
+            self.log(f"⚠️ Live transcription of {path.name} failed ({e}) - transcribing it once it is finished")
+            with self._lock:
+                self._following.discard(path)
+                self._no_follow.add(path)
+                self._seen.pop(path, None)
+            return
+        self.state.set(path, stat.st_size, stat.st_mtime_ns, "done", str(output))
+        with self._lock:
+            self._following.discard(path)
+            self._seen[path] = (stat.st_size, stat.st_mtime_ns)
+        self.log(f"✅ {path.name} → {output.name} (live)")
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                _, _, path, size, mtime_ns = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            try:
+                stat = path.stat()
+                if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+                    # Changed while queued; it will settle and be queued again
+                    with self._lock:
+                        self._seen.pop(path, None)
+                    continue
+            except OSError:
+                continue
+
+            output = transcript_path(path, self.output_format)
+            self.state.set(path, size, mtime_ns, "running")
+            self.log(f"🎬 Transcribing {path.name}")
+            try:
+                result = self.transcribe(path, output)
+            except Exception as e:
+                self.state.set(path, size, mtime_ns, "failed", error=str(e))
+                self.log(f"❌ {path.name}: {e}")
+                continue
+            self.state.set(path, size, mtime_ns, "done", str(output))
+            cached = " (from cache)" if result and result.get("cached") else ""
+            self.log(f"✅ {path.name} → {output.name}{cached}")